@@ -1,19 +1,29 @@
 import sys
 sys.dont_write_bytecode = True
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context, send_file
 from flask_login import login_required, logout_user, current_user, login_user
-from sqlalchemy import event
+from sqlalchemy import event, and_, or_, type_coerce, func, case, inspect
 import calendar
 import os
 import base64
 from extensions import db, login_manager
 from instance.install_core import install_core
-from datetime import datetime, timedelta
-from instance.base import Expenses, Employee, Company, MonthlySummary, SimpleMonthlySummary, SimpleExpenses, Settings, Info
-from day_checker import start_day_checker
+from datetime import datetime, timedelta, date
+from instance.base import Expenses, Employee, Company, MonthlySummary, YearlySummary, DailySummary, SimpleMonthlySummary, SimpleExpenses, Settings, Info, BackgroundJob, period_of, to_cents, from_cents, LOCAL_TIMEZONE, OTHER_CATEGORY
+from day_checker import start_day_checker, schedule_company_salaries
+from job_queue import enqueue_job, job_data, save_job_upload, start_job_workers
+from ledger_service import add_ledger_entry, delete_ledger_entry, update_ledger_entry
+from ledger_export import export_query, iter_csv, write_xlsx
+from summary_rebuild import materialize_summary, SIMPLE_FIELDS
+from period_totals import load_period_totals, load_range_totals, load_daily_summaries, load_daily_values, quarter_window, shift_month, ROLLUP_FIELDS
+from downsample import lttb_indices, bucket_sums, bucket_labels
+from storage_profile import configure_database, init_storage
+from request_metrics import init_metrics, render_metrics, metrics_access_allowed
+from response_cache import versioned_response, summary_version, summary_window_version, rollup_window_version
+from user_cache import load_cached_user, invalidate_user
 from flask_migrate import Migrate
-from auto_migrate import run_auto_migration
+from auto_migrate import run_migrations
 
 
 app = Flask(__name__)
@@ -21,17 +31,39 @@ migrate = Migrate(app, db)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(basedir, 'instance', 'test.db')}"
+MONTH_LABELS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
+                'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+MAX_CHART_MONTHS = 60
+MAX_SUMMARY_YEARS = 30
+PERIOD_SCOPES = ('quarter', 'year', 'ytd', 'ttm')
+MAX_DAILY_DAYS = 366
+DAILY_BUCKETS = ('day', 'week')
+DEFAULT_CHART_POINTS = 400
+MAX_CHART_POINTS = 2000
+PIE_TOP_CATEGORIES = 8
+TRANSACTIONS_CHUNK_SIZE = 500
+MAX_TRANSACTIONS_PAGE_SIZE = 1000
+COMPANIES_PER_PAGE = 24
+MAX_COMPANIES_PER_PAGE = 200
+
+configure_database(app, f"sqlite:///{os.path.join(basedir, 'instance', 'test.db')}")
 app.config["SECRET_KEY"] = os.urandom(24)
 
 db.init_app(app)
+init_storage(app)
+init_metrics(app)
 login_manager.init_app(app)
 login_manager.login_view = "login"  
 
 @login_manager.user_loader
 def load_user(user_id):
-    from instance.base import User
-    return User.query.get(int(user_id))
+    return load_cached_user(int(user_id))
+
+@app.route('/metrics')
+def metrics():
+    if not metrics_access_allowed():
+        return Response('Acesso negado', status=403, mimetype='text/plain')
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/main-menu/<company_id>')
 @login_required
@@ -76,12 +108,14 @@ def login():
                 flash(f"❌ Senha incorreta! Tentativa {user.failed_login_attempts}/3", "error")
             
             db.session.commit()
+            invalidate_user(user.id)
             return render_template("login.html")
         
         else:
             user.failed_login_attempts = 0
             user.last_login = datetime.utcnow()
             db.session.commit()
+            invalidate_user(user.id)
             
             login_user(user)
             return redirect(url_for("company"))
@@ -142,11 +176,9 @@ def add_expense():
             company_id=int(company_id) 
         )
         
-        db.session.add(new_expense)
+        add_ledger_entry(new_expense)
         db.session.commit()
         
-        update_monthly_summary(new_expense)
-        
         flash('✅ Transação adicionada com sucesso!', 'success')
         return redirect(url_for('expenses', company_id=company_id))
         
@@ -160,63 +192,6 @@ def add_expense():
             flash(f'❌ Erro ao adicionar transação: {str(e)}', 'error')
             return redirect(url_for('company'))
         
-def update_monthly_summary(expense):
-    try:
-        transaction_date = expense.create_date
-        month = transaction_date.month
-        year = transaction_date.year
-        
-        print(f"Updating monthly summary for: Month {month}, Year {year}, Company {expense.company_id}")
-        
-        summary = MonthlySummary.query.filter_by(
-            month=month, 
-            year=year,
-            company_id=expense.company_id
-        ).first()
-        
-        if not summary:
-            print(f"Creating new monthly summary")
-            summary = MonthlySummary(
-                month=month,
-                year=year,
-                company_id=expense.company_id,
-                total_sales=0.0,
-                total_sales_without_vat=0.0,
-                total_vat=0.0,
-                total_costs=0.0,
-                total_costs_without_vat=0.0,  
-                profit=0.0,
-                profit_without_vat=0.0
-            )
-            db.session.add(summary)
-        
-        if summary.total_costs_without_vat is None:
-            summary.total_costs_without_vat = 0.0
-        if summary.total_sales_without_vat is None:
-            summary.total_sales_without_vat = 0.0
-        
-        if expense.transaction_type.lower() == 'ganho':
-            print(f"Processing gain: {expense.gross_value}")
-            summary.total_sales += expense.gross_value
-            summary.total_sales_without_vat += expense.net_value
-            summary.total_vat += expense.iva_value
-        elif expense.transaction_type.lower() == 'despesa':
-            print(f"Processing expense: {expense.gross_value}")
-            summary.total_costs += expense.gross_value
-            summary.total_costs_without_vat += expense.net_value
-            summary.total_vat -= expense.iva_value
-        
-        summary.profit = summary.total_sales - summary.total_costs
-        summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs_without_vat
-        
-        print(f"Committing changes: profit={summary.profit}, profit_without_vat={summary.profit_without_vat}")
-        db.session.commit()
-        print("Monthly summary updated successfully")
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error updating monthly summary: {str(e)}")
-        raise
-    
 @app.route('/delete-expense/<int:expense_id>', methods=['POST'])
 @login_required
 def delete_expense(expense_id):
@@ -230,70 +205,17 @@ def delete_expense(expense_id):
         if company and company.user_id != current_user.id:
             return jsonify({'success': False, 'message': 'Acesso negado à empresa'}, 403)
         
-        transaction_type = expense.transaction_type
-        gross_value = expense.gross_value
-        net_value = expense.net_value
-        iva_value = expense.iva_value
         company_id = expense.company_id
-        transaction_date = expense.create_date
         
-        db.session.delete(expense)
+        delete_ledger_entry(expense)
         db.session.commit()
         
-        remove_from_monthly_summary(
-            transaction_date,
-            company_id,
-            transaction_type,
-            gross_value,
-            net_value,
-            iva_value
-        )
-        
         return jsonify({'success': True, 'company_id': company_id}), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
     
-def remove_from_monthly_summary(date, company_id, transaction_type, gross_value, net_value, iva_value):
-    try:
-        month = date.month
-        year = date.year
-        
-        print(f"Removing from monthly summary: Month {month}, Year {year}, Company {company_id}")
-        
-        summary = MonthlySummary.query.filter_by(
-            month=month, 
-            year=year,
-            company_id=company_id
-        ).first()
-        
-        if summary:
-            if summary.total_costs_without_vat is None:
-                summary.total_costs_without_vat = 0.0
-            if summary.total_sales_without_vat is None:
-                summary.total_sales_without_vat = 0.0
-                
-            if transaction_type.lower() == 'ganho':
-                summary.total_sales -= gross_value
-                summary.total_sales_without_vat -= net_value
-                summary.total_vat -= iva_value
-            elif transaction_type.lower() == 'despesa':
-                summary.total_costs -= gross_value
-                summary.total_costs_without_vat -= net_value
-                summary.total_vat += iva_value
-            
-            summary.profit = summary.total_sales - summary.total_costs
-            summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs_without_vat
-            
-            print(f"Committing changes: profit={summary.profit}, profit_without_vat={summary.profit_without_vat}")
-            db.session.commit()
-            print("Monthly summary updated successfully after removal")
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error removing from monthly summary: {str(e)}")
-        raise
-    
 @app.route('/get-expense/<int:expense_id>')
 @login_required
 def get_expense(expense_id):
@@ -331,27 +253,16 @@ def update_expense(expense_id):
             flash('❌ Você não tem permissão para editar esta transação.', 'error')
             return redirect(url_for('expenses', company_id=company_id))
         
-        old_transaction_type = expense.transaction_type
-        old_gross_value = expense.gross_value
-        old_net_value = expense.net_value
-        old_iva_value = expense.iva_value
-        
-        expense.transaction_type = request.form.get('transaction_type')
-        expense.description = request.form.get('description')
-        expense.gross_value = float(request.form.get('gross_value'))
-        expense.iva_rate = float(request.form.get('iva_rate'))
-        expense.iva_value = float(request.form.get('iva_value'))
-        expense.net_value = float(request.form.get('net_value'))
-        
-        db.session.commit()
-        
-        adjust_monthly_summary(
+        update_ledger_entry(
             expense,
-            old_transaction_type,
-            old_gross_value,
-            old_net_value,
-            old_iva_value
+            transaction_type=request.form.get('transaction_type'),
+            description=request.form.get('description'),
+            gross_value=float(request.form.get('gross_value')),
+            iva_rate=float(request.form.get('iva_rate')),
+            iva_value=float(request.form.get('iva_value')),
+            net_value=float(request.form.get('net_value'))
         )
+        db.session.commit()
         
         flash('✅ Transação atualizada com sucesso!', 'success')
         return redirect(url_for('expenses', company_id=company_id))
@@ -370,79 +281,58 @@ def update_expense(expense_id):
         else:
             return redirect(url_for('company'))
         
-def adjust_monthly_summary(expense, old_type, old_gross, old_net, old_iva):
+def company_access_denied(company_id):
+    # Import and export share one rule: the company's owner or an Admin; a missing id is left to the parameter checks
+    if not company_id:
+        return None
+    
+    company = Company.query.get_or_404(company_id)
+    if company.user_id != current_user.id and current_user.type != 'Admin':
+        return jsonify({
+            'success': False,
+            'message': 'Acesso negado à empresa'
+        }), 403
+    return None
+
+@app.route('/import-expenses', methods=['POST'])
+@login_required
+def import_expenses():
+    company_id = request.form.get('company_id', type=int)
+    denied = company_access_denied(company_id)
+    if denied:
+        return denied
+    
     try:
-        transaction_date = expense.create_date
-        month = transaction_date.month
-        year = transaction_date.year
+        simple = request.form.get('target') == 'simple'
+        file = request.files.get('file')
         
-        print(f"Adjusting monthly summary for: Month {month}, Year {year}, Company {expense.company_id}")
+        if not company_id or not file or not file.filename:
+            return jsonify({
+                'success': False,
+                'message': 'Empresa e ficheiro são obrigatórios.'
+            }), 400
         
-        summary = MonthlySummary.query.filter_by(
-            month=month, 
-            year=year,
-            company_id=expense.company_id
-        ).first()
+        # The file is parsed by a background worker; the report is stored as the job result
+        job_id = enqueue_job('import_ledger', {
+            'path': save_job_upload(file),
+            'filename': file.filename,
+            'company_id': company_id,
+            'user_id': current_user.id,
+            'simple': simple
+        }, user_id=current_user.id, company_id=company_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Importação em curso.',
+            'job_id': job_id
+        }), 202
         
-        if not summary:
-            print(f"Creating new monthly summary during adjustment")
-            summary = MonthlySummary(
-                month=month,
-                year=year,
-                company_id=expense.company_id,
-                total_sales=0.0,
-                total_sales_without_vat=0.0,
-                total_vat=0.0,
-                total_costs=0.0,
-                total_costs_without_vat=0.0,
-                profit=0.0,
-                profit_without_vat=0.0
-            )
-            db.session.add(summary)
-            
-            if expense.transaction_type.lower() == 'ganho':
-                summary.total_sales += expense.gross_value
-                summary.total_sales_without_vat += expense.net_value
-                summary.total_vat += expense.iva_value
-            elif expense.transaction_type.lower() == 'despesa':
-                summary.total_costs += expense.gross_value
-                summary.total_costs_without_vat += expense.net_value
-                summary.total_vat -= expense.iva_value  
-        else:
-            if summary.total_costs_without_vat is None:
-                summary.total_costs_without_vat = 0.0
-            if summary.total_sales_without_vat is None:
-                summary.total_sales_without_vat = 0.0
-                
-            if old_type.lower() == 'ganho':
-                summary.total_sales -= old_gross
-                summary.total_sales_without_vat -= old_net
-                summary.total_vat -= old_iva
-            elif old_type.lower() == 'despesa':
-                summary.total_costs -= old_gross
-                summary.total_costs_without_vat -= old_net
-                summary.total_vat += old_iva  
-            
-            # Adicionar os novos valores
-            if expense.transaction_type.lower() == 'ganho':
-                summary.total_sales += expense.gross_value
-                summary.total_sales_without_vat += expense.net_value
-                summary.total_vat += expense.iva_value
-            elif expense.transaction_type.lower() == 'despesa':
-                summary.total_costs += expense.gross_value
-                summary.total_costs_without_vat += expense.net_value
-                summary.total_vat -= expense.iva_value 
-        
-        summary.profit = summary.total_sales - summary.total_costs
-        summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs_without_vat
-        
-        print(f"Committing changes: profit={summary.profit}, profit_without_vat={summary.profit_without_vat}")
-        db.session.commit()
-        print("Monthly summary adjusted successfully")
     except Exception as e:
         db.session.rollback()
-        print(f"Error adjusting monthly summary: {str(e)}")
-        raise
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao importar transações: {str(e)}'
+        }), 500
     
 @app.route('/employee/<int:company_id>')
 @login_required
@@ -470,13 +360,6 @@ def add_employee():
                 'message': 'Por favor, preencha todos os campos obrigatórios corretamente.'
             }), 400
         
-        company = Company.query.get(company_id)
-        if not company or company.user_id != current_user.id:
-            return jsonify({
-                'success': False,
-                'message': 'Empresa inválida ou sem permissão de acesso.'
-            }), 403
-        
         new_employee = Employee(
             name=name,
             position=position,
@@ -728,11 +611,60 @@ def toggle_employee_status(employee_id):
             'message': f'Erro ao atualizar status do empregado: {str(e)}'
         }), 500
     
+def company_directory(search, page, per_page):
+    query = Company.query
+    
+    if search:
+        term = search.strip().lower()
+        name = func.lower(Company.name)
+        # Prefix matches come first, then any other company whose name contains the term
+        query = query.filter(name.contains(term, autoescape=True)).order_by(
+            case((name.startswith(term, autoescape=True), 0), else_=1),
+            Company.name
+        )
+    else:
+        query = query.order_by(Company.name)
+    
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return pagination, load_company_activity([company.id for company in pagination.items])
+
+def load_company_activity(company_ids):
+    if not company_ids:
+        return {}
+    
+    today = datetime.now(LOCAL_TIMEZONE)
+    rows = db.session.query(
+        Company.id,
+        func.count(Expenses.id),
+        func.max(Expenses.create_date),
+        func.max(MonthlySummary.profit)
+    ).outerjoin(
+        Expenses, Expenses.company_id == Company.id
+    ).outerjoin(
+        MonthlySummary, and_(
+            MonthlySummary.company_id == Company.id,
+            MonthlySummary.year == today.year,
+            MonthlySummary.month == today.month
+        )
+    ).filter(Company.id.in_(company_ids)).group_by(Company.id)
+    
+    return {
+        company_id: {
+            'transaction_count': transaction_count,
+            'last_activity': LOCAL_TIMEZONE.fromutc(last_activity) if last_activity else None,
+            'month_profit': month_profit or 0.0
+        }
+        for company_id, transaction_count, last_activity, month_profit in rows
+    }
+
 @app.route('/company')
 @login_required
 def company():
-    companies = Company.query.all()
-    return render_template('company.html', companies=companies)
+    search = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    
+    pagination, activity = company_directory(search, page, COMPANIES_PER_PAGE)
+    return render_template('company.html', companies=pagination.items, activity=activity, pagination=pagination, search=search)
 
 @app.route('/add-company', methods=['POST'])
 @login_required
@@ -794,22 +726,34 @@ def add_company():
 @login_required
 def get_companies():
     try:
-        companies = Company.query.all()
+        search = request.args.get('q', '').strip()
+        page = request.args.get('page', 1, type=int)
+        per_page = min(max(request.args.get('per_page', COMPANIES_PER_PAGE, type=int), 1), MAX_COMPANIES_PER_PAGE)
+        
+        pagination, activity = company_directory(search, page, per_page)
         companies_list = []
         
-        for company in companies:
+        for company in pagination.items:
+            company_activity = activity.get(company.id, {})
+            last_activity = company_activity.get('last_activity')
             companies_list.append({
                 'id': company.id,
                 'name': company.name,
                 'location': company.location,
                 'relationship_type': company.relationship_type,
                 'tax_id': company.tax_id,
-                'is_active': company.is_active
+                'is_active': company.is_active,
+                'transaction_count': company_activity.get('transaction_count', 0),
+                'last_activity': last_activity.strftime("%Y-%m-%d %H:%M:%S") if last_activity else None,
+                'month_profit': company_activity.get('month_profit', 0.0)
             })
         
         return jsonify({
             'success': True,
-            'companies': companies_list
+            'companies': companies_list,
+            'page': pagination.page,
+            'pages': pagination.pages,
+            'total': pagination.total
         })
     
     except Exception as e:
@@ -892,8 +836,133 @@ def dashboard(company_id):
     company = Company.query.get_or_404(company_id)
     return render_template('dashboard_viewer.html', company_id=company_id, company=company)
 
+def financial_summary_version():
+    company_id = request.args.get('company_id', type=int)
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+    
+    if not all([company_id, month, year]):
+        return None
+    return summary_window_version(MonthlySummary, company_id, previous_month(year, month), (year, month))
+
+def financial_summary_range_version():
+    company_id = request.args.get('company_id', type=int)
+    start = parse_year_month(request.args.get('from'))
+    end = parse_year_month(request.args.get('to'))
+    
+    if not all([company_id, start, end]) or start > end:
+        return None
+    return summary_window_version(MonthlySummary, company_id, previous_month(*start), end)
+
+def chart_data_version():
+    company_id = request.args.get('company_id', type=int)
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+    month_count = min(max(request.args.get('months', 6, type=int), 1), MAX_CHART_MONTHS)
+    
+    if not all([company_id, month, year]):
+        return None
+    if request.args.get('type', 'bar') == 'pie':
+        month_count = 1
+    return summary_window_version(MonthlySummary, company_id, month_window(year, month, month_count)[0], (year, month))
+
+def simple_financial_summary_version():
+    company_id = request.args.get('company_id', type=int)
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+    
+    if not all([company_id, month, year]):
+        return None
+    
+    # A missing month is materialized before the version is read, so the response is cached under the row it was built from
+    materialize_summary(SimpleMonthlySummary, company_id, year, month)
+    return summary_window_version(SimpleMonthlySummary, company_id, previous_month(year, month), (year, month))
+
+def period_summary_windows():
+    company_id = request.args.get('company_id', type=int)
+    scope = request.args.get('scope', 'ytd')
+    year = request.args.get('year', type=int)
+    month = request.args.get('month', type=int)
+    quarter = request.args.get('quarter', type=int)
+    
+    if not all([company_id, year]) or scope not in PERIOD_SCOPES:
+        return None
+    
+    # Each scope is compared with the window just before it: previous quarter, previous year or the same months a year earlier
+    if scope == 'quarter':
+        if quarter not in (1, 2, 3, 4):
+            return None
+        start, end = quarter_window(year, quarter)
+        return company_id, (start, end), (shift_month(*start, -3), shift_month(*end, -3))
+    
+    if scope == 'year':
+        return company_id, ((year, 1), (year, 12)), ((year - 1, 1), (year - 1, 12))
+    
+    if not month or not 1 <= month <= 12:
+        return None
+    
+    if scope == 'ytd':
+        return company_id, ((year, 1), (year, month)), ((year - 1, 1), (year - 1, month))
+    
+    start = shift_month(year, month, -11)
+    return company_id, (start, (year, month)), (shift_month(*start, -12), (year - 1, month))
+
+def period_summary_version():
+    windows = period_summary_windows()
+    if not windows:
+        return None
+    company_id, window, previous = windows
+    return rollup_window_version(company_id, previous[0], window[1])
+
+def yearly_summaries_version():
+    company_id = request.args.get('company_id', type=int)
+    start = request.args.get('from', type=int)
+    end = request.args.get('to', type=int)
+    
+    if not all([company_id, start, end]) or start > end:
+        return None
+    return summary_version(YearlySummary, company_id, YearlySummary.year.between(start - 1, end))
+
+def parse_date_range():
+    try:
+        start = date.fromisoformat(request.args.get('from', ''))
+        end = date.fromisoformat(request.args.get('to', ''))
+    except ValueError:
+        return None
+    
+    if start > end:
+        return None
+    return start, end
+
+def range_summary_version():
+    company_id = request.args.get('company_id', type=int)
+    date_range = parse_date_range()
+    
+    if not company_id or not date_range:
+        return None
+    start, end = date_range
+    previous_start = start - (end - start) - timedelta(days=1)
+    return '/'.join([
+        rollup_window_version(company_id, (previous_start.year, previous_start.month), (end.year, end.month)),
+        summary_version(DailySummary, company_id, DailySummary.date.between(previous_start, end))
+    ])
+
+def daily_summaries_version():
+    company_id = request.args.get('company_id', type=int)
+    date_range = parse_date_range()
+    
+    if not company_id or not date_range:
+        return None
+    start, end = date_range
+    return summary_version(DailySummary, company_id, DailySummary.date.between(start, end))
+
+def settings_version(company_id):
+    version = db.session.query(Settings.version).filter_by(company_id=company_id).scalar()
+    return version or 0
+
 @app.route('/api/financial-summary')
 @login_required
+@versioned_response(financial_summary_version)
 def api_financial_summary():
     try:
         company_id = request.args.get('company_id', type=int)
@@ -915,25 +984,9 @@ def api_financial_summary():
         data = {}
         
         if summary:
-            data = {
-                'total_sales': summary.total_sales,
-                'total_sales_without_vat': summary.total_sales_without_vat,
-                'total_vat': summary.total_vat,
-                'total_costs': summary.total_costs,
-                'total_costs_without_vat': summary.total_costs_without_vat, 
-                'profit': summary.profit,
-                'profit_without_vat': summary.profit_without_vat,
-                'total_employee_salaries': summary.total_employee_salaries,
-                'total_employee_insurance': summary.total_employee_insurance,
-                'total_employer_social_security': summary.total_employer_social_security
-            }
-            
-            prev_month = month - 1
-            prev_year = year
+            data = monthly_summary_data(summary)
             
-            if prev_month == 0:
-                prev_month = 12
-                prev_year -= 1
+            prev_year, prev_month = previous_month(year, month)
                 
             prev_summary = MonthlySummary.query.filter_by(
                 company_id=company_id,
@@ -942,23 +995,264 @@ def api_financial_summary():
             ).first()
             
             if prev_summary:
-                if prev_summary.total_sales > 0:
-                    data['sales_change'] = ((summary.total_sales - prev_summary.total_sales) / prev_summary.total_sales) * 100
-                
-                if prev_summary.total_costs > 0:
-                    data['costs_change'] = ((summary.total_costs - prev_summary.total_costs) / prev_summary.total_costs) * 100
-                
-                if prev_summary.profit > 0:
-                    data['profit_change'] = ((summary.profit - prev_summary.profit) / prev_summary.profit) * 100
-                
-                if prev_summary.total_vat > 0:
-                    data['vat_change'] = ((summary.total_vat - prev_summary.total_vat) / prev_summary.total_vat) * 100
+                data.update(summary_changes(summary, prev_summary))
+        
+        return jsonify({
+            'success': True,
+            'summary': data
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar dados financeiros: {str(e)}'
+        }), 500
+    
+def monthly_summary_data(summary):
+    return {
+        'total_sales': summary.total_sales,
+        'total_sales_without_vat': summary.total_sales_without_vat,
+        'total_vat': summary.total_vat,
+        'total_costs': summary.total_costs,
+        'total_costs_without_vat': summary.total_costs_without_vat, 
+        'profit': summary.profit,
+        'profit_without_vat': summary.profit_without_vat,
+        'total_employee_salaries': summary.total_employee_salaries,
+        'total_employee_insurance': summary.total_employee_insurance,
+        'total_employer_social_security': summary.total_employer_social_security
+    }
+
+def summary_changes(summary, prev_summary):
+    changes = {}
+    
+    if prev_summary.total_sales > 0:
+        changes['sales_change'] = ((summary.total_sales - prev_summary.total_sales) / prev_summary.total_sales) * 100
+    
+    if prev_summary.total_costs > 0:
+        changes['costs_change'] = ((summary.total_costs - prev_summary.total_costs) / prev_summary.total_costs) * 100
+    
+    if prev_summary.profit > 0:
+        changes['profit_change'] = ((summary.profit - prev_summary.profit) / prev_summary.profit) * 100
+    
+    if prev_summary.total_vat > 0:
+        changes['vat_change'] = ((summary.total_vat - prev_summary.total_vat) / prev_summary.total_vat) * 100
+    
+    if prev_summary.total_employee_salaries > 0:
+        changes['employee_costs_change'] = ((summary.total_employee_salaries - prev_summary.total_employee_salaries) / prev_summary.total_employee_salaries) * 100
+    
+    return changes
+
+def previous_month(year, month):
+    if month == 1:
+        return year - 1, 12
+    return year, month - 1
+
+def month_window(end_year, end_month, count):
+    months = []
+    year, month = end_year, end_month
+    for _ in range(count):
+        months.append((year, month))
+        year, month = previous_month(year, month)
+    months.reverse()
+    return months
+
+def load_monthly_summaries(company_id, start, end):
+    summaries = MonthlySummary.query.filter(
+        MonthlySummary.company_id == company_id,
+        MonthlySummary.year.between(start[0], end[0]),
+        (MonthlySummary.year * 100 + MonthlySummary.month).between(period_of(*start), period_of(*end))
+    ).all()
+    
+    return {(summary.year, summary.month): summary for summary in summaries}
+
+def parse_year_month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    
+    if not 1 <= month <= 12:
+        return None
+    return year, month
+
+@app.route('/api/financial-summary/range')
+@login_required
+@versioned_response(financial_summary_range_version)
+def api_financial_summary_range():
+    try:
+        company_id = request.args.get('company_id', type=int)
+        start = parse_year_month(request.args.get('from'))
+        end = parse_year_month(request.args.get('to'))
+        
+        if not all([company_id, start, end]) or start > end:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        if (end[0] - start[0]) * 12 + end[1] - start[1] >= MAX_CHART_MONTHS:
+            return jsonify({
+                'success': False,
+                'message': f'Intervalo demasiado longo (máximo {MAX_CHART_MONTHS} meses)'
+            }), 400
+        
+        month_count = (end[0] - start[0]) * 12 + end[1] - start[1] + 1
+        by_month = load_monthly_summaries(company_id, previous_month(*start), end)
+        
+        months = []
+        for year, month in month_window(end[0], end[1], month_count):
+            summary = by_month.get((year, month))
+            data = {}
+            
+            if summary:
+                data = monthly_summary_data(summary)
+                prev_summary = by_month.get(previous_month(year, month))
+                if prev_summary:
+                    data.update(summary_changes(summary, prev_summary))
+            
+            months.append({
+                'year': year,
+                'month': month,
+                'summary': data
+            })
+        
+        return jsonify({
+            'success': True,
+            'months': months
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar dados financeiros: {str(e)}'
+        }), 500
+
+@app.route('/api/period-summary')
+@login_required
+@versioned_response(period_summary_version)
+def api_period_summary():
+    try:
+        windows = period_summary_windows()
+        
+        if not windows:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        company_id, (start, end), (prev_start, prev_end) = windows
+        totals = load_period_totals(company_id, start, end)
+        
+        data = {}
+        
+        if totals:
+            data = monthly_summary_data(totals)
+            
+            prev_totals = load_period_totals(company_id, prev_start, prev_end)
+            if prev_totals:
+                data.update(summary_changes(totals, prev_totals))
+        
+        return jsonify({
+            'success': True,
+            'scope': request.args.get('scope', 'ytd'),
+            'from': f"{start[0]}-{start[1]:02d}",
+            'to': f"{end[0]}-{end[1]:02d}",
+            'summary': data
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar dados financeiros: {str(e)}'
+        }), 500
+
+@app.route('/api/yearly-summaries')
+@login_required
+@versioned_response(yearly_summaries_version)
+def api_yearly_summaries():
+    try:
+        company_id = request.args.get('company_id', type=int)
+        start = request.args.get('from', type=int)
+        end = request.args.get('to', type=int)
+        
+        if not all([company_id, start, end]) or start > end:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        if end - start >= MAX_SUMMARY_YEARS:
+            return jsonify({
+                'success': False,
+                'message': f'Intervalo demasiado longo (máximo {MAX_SUMMARY_YEARS} anos)'
+            }), 400
+        
+        summaries = YearlySummary.query.filter(
+            YearlySummary.company_id == company_id,
+            YearlySummary.year.between(start - 1, end)
+        ).all()
+        by_year = {summary.year: summary for summary in summaries}
+        
+        years = []
+        for year in range(start, end + 1):
+            summary = by_year.get(year)
+            data = {}
+            
+            if summary:
+                data = monthly_summary_data(summary)
                 
-                if prev_summary.total_employee_salaries > 0:
-                    data['employee_costs_change'] = ((summary.total_employee_salaries - prev_summary.total_employee_salaries) / prev_summary.total_employee_salaries) * 100
+                prev_summary = by_year.get(year - 1)
+                if prev_summary:
+                    data.update(summary_changes(summary, prev_summary))
+            
+            years.append({
+                'year': year,
+                'summary': data
+            })
+        
+        return jsonify({
+            'success': True,
+            'years': years
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar dados financeiros: {str(e)}'
+        }), 500
+
+@app.route('/api/range-summary')
+@login_required
+@versioned_response(range_summary_version)
+def api_range_summary():
+    try:
+        company_id = request.args.get('company_id', type=int)
+        date_range = parse_date_range()
+        
+        if not company_id or not date_range:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        start, end = date_range
+        totals = load_range_totals(company_id, start, end)
+        
+        data = {}
+        
+        if totals:
+            data = monthly_summary_data(totals)
+            
+            # Compared with the window of the same length that ends the day before
+            prev_end = start - timedelta(days=1)
+            prev_totals = load_range_totals(company_id, prev_end - (end - start), prev_end)
+            if prev_totals:
+                data.update(summary_changes(totals, prev_totals))
         
         return jsonify({
             'success': True,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
             'summary': data
         })
         
@@ -968,14 +1262,73 @@ def api_financial_summary():
             'message': f'Erro ao buscar dados financeiros: {str(e)}'
         }), 500
     
+@app.route('/api/daily-summaries')
+@login_required
+@versioned_response(daily_summaries_version)
+def api_daily_summaries():
+    try:
+        company_id = request.args.get('company_id', type=int)
+        date_range = parse_date_range()
+        bucket = request.args.get('bucket', 'day')
+        
+        if not company_id or not date_range or bucket not in DAILY_BUCKETS:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        start, end = date_range
+        if (end - start).days >= MAX_DAILY_DAYS:
+            return jsonify({
+                'success': False,
+                'message': f'Intervalo demasiado longo (máximo {MAX_DAILY_DAYS} dias)'
+            }), 400
+        
+        by_day = load_daily_summaries(company_id, start, end)
+        
+        # Weeks start on Monday; amounts are added in cents so the bucket totals stay exact
+        buckets = {}
+        day = start
+        while day <= end:
+            key = day - timedelta(days=day.weekday()) if bucket == 'week' else day
+            totals = buckets.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+            
+            summary = by_day.get(day)
+            if summary:
+                for field in ROLLUP_FIELDS:
+                    totals[field] += to_cents(getattr(summary, field) or 0)
+            day += timedelta(days=1)
+        
+        return jsonify({
+            'success': True,
+            'bucket': bucket,
+            'days': [
+                {
+                    'date': key.isoformat(),
+                    'summary': {field: from_cents(total) for field, total in totals.items()}
+                }
+                for key, totals in buckets.items()
+            ]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar dados financeiros: {str(e)}'
+        }), 500
+    
 @app.route('/api/chart-data')
 @login_required
+@versioned_response(chart_data_version)
 def api_chart_data():
     try:
         company_id = request.args.get('company_id', type=int)
         chart_type = request.args.get('type', 'bar')
         current_month = request.args.get('month', type=int)
         current_year = request.args.get('year', type=int)
+        month_count = min(max(request.args.get('months', 6, type=int), 1), MAX_CHART_MONTHS)
+        points = min(max(request.args.get('points', DEFAULT_CHART_POINTS, type=int), 3), MAX_CHART_POINTS)
+        granularity = request.args.get('granularity', 'month')
         
         if not company_id:
             return jsonify({
@@ -994,65 +1347,51 @@ def api_chart_data():
             employee_costs_data = []
             profit_data = []
             
-            for i in range(5, -1, -1):
-                month = current_month - i
-                year = current_year
-                
-                while month <= 0:
-                    month += 12
-                    year -= 1
-                
-                monthly_data = MonthlySummary.query.filter_by(
-                    company_id=company_id,
-                    month=month,
-                    year=year
-                ).first()
+            window = month_window(current_year, current_month, month_count)
+            
+            if granularity == 'day':
+                start = date(*window[0], 1)
+                end = date(current_year, current_month, calendar.monthrange(current_year, current_month)[1])
+                by_day = load_daily_values(company_id, start, end, ['total_sales', 'total_costs', 'total_employee_salaries', 'profit'])
                 
-                month_name = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
-                              'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez'][month-1]
-                labels.append(f"{month_name}")
+                day = start
+                while day <= end:
+                    sales, costs, salaries, profit = by_day.get(day, (0, 0, 0, 0))
+                    labels.append(day.strftime('%d/%m/%Y'))
+                    sales_data.append(sales or 0)
+                    expenses_data.append((costs or 0) - (salaries or 0))
+                    employee_costs_data.append(salaries or 0)
+                    profit_data.append(profit or 0)
+                    day += timedelta(days=1)
+            else:
+                summaries = load_monthly_summaries(company_id, window[0], window[-1])
                 
-                if monthly_data:
-                    sales_data.append(round(monthly_data.total_sales))
-                    expenses_data.append(round(monthly_data.total_costs - (monthly_data.total_employee_salaries or 0)))
-                    employee_costs_data.append(round(monthly_data.total_employee_salaries or 0))
-                    profit_data.append(round(monthly_data.profit))
-                else:
-                    sales_data.append(0)
-                    expenses_data.append(0)
-                    employee_costs_data.append(0)
-                    profit_data.append(0)
-            
-            chart_data = {
-                'labels': labels,
-                'datasets': [
-                    {
-                        'label': 'Receitas',
-                        'data': sales_data,
-                        'backgroundColor': '#22c55e',
-                        'borderRadius': 4
-                    },
-                    {
-                        'label': 'Despesas',
-                        'data': expenses_data,
-                        'backgroundColor': '#f59e0b',
-                        'borderRadius': 4
-                    },
-                    {
-                        'label': 'Custos Colaboradores',
-                        'data': employee_costs_data,
-                        'backgroundColor': '#8b5cf6',
-                        'borderRadius': 4
-                    }
-                ]
-            }
+                for year, month in window:
+                    monthly_data = summaries.get((year, month))
+                    
+                    month_name = MONTH_LABELS[month - 1]
+                    labels.append(f"{month_name} {year}" if month_count > 12 else month_name)
+                    
+                    if monthly_data:
+                        sales_data.append(monthly_data.total_sales)
+                        expenses_data.append(monthly_data.total_costs - (monthly_data.total_employee_salaries or 0))
+                        employee_costs_data.append(monthly_data.total_employee_salaries or 0)
+                        profit_data.append(monthly_data.profit)
+                    else:
+                        sales_data.append(0)
+                        expenses_data.append(0)
+                        employee_costs_data.append(0)
+                        profit_data.append(0)
             
+            # Long series are reduced to the requested number of points before they reach the browser:
+            # the profit line keeps its shape through LTTB, bars are summed over consecutive periods
             if chart_type == 'line':
+                kept = lttb_indices(profit_data, points)
                 chart_data = {
-                    'labels': labels,
+                    'labels': [labels[index] for index in kept],
                     'datasets': [{
                         'label': 'Performance Financeira',
-                        'data': profit_data,
+                        'data': [round(profit_data[index]) for index in kept],
                         'borderColor': '#3b82f6',
                         'backgroundColor': 'rgba(59, 130, 246, 0.1)',
                         'fill': True,
@@ -1060,37 +1399,51 @@ def api_chart_data():
                         'pointBackgroundColor': '#3b82f6',
                         'pointBorderColor': '#ffffff',
                         'pointBorderWidth': 2,
-                        'pointRadius': 6
+                        'pointRadius': 6 if len(kept) <= MAX_CHART_MONTHS else 0
                     }]
                 }
+            else:
+                chart_data = {
+                    'labels': bucket_labels(labels, points),
+                    'datasets': [
+                        {
+                            'label': 'Receitas',
+                            'data': [round(value) for value in bucket_sums(sales_data, points)],
+                            'backgroundColor': '#22c55e',
+                            'borderRadius': 4
+                        },
+                        {
+                            'label': 'Despesas',
+                            'data': [round(value) for value in bucket_sums(expenses_data, points)],
+                            'backgroundColor': '#f59e0b',
+                            'borderRadius': 4
+                        },
+                        {
+                            'label': 'Custos Colaboradores',
+                            'data': [round(value) for value in bucket_sums(employee_costs_data, points)],
+                            'backgroundColor': '#8b5cf6',
+                            'borderRadius': 4
+                        }
+                    ]
+                }
         
         elif chart_type == 'pie':
-            expenses = Expenses.query.filter(
+            # Amounts are summed in cents by the database; one row per category comes back
+            category_total = func.sum(type_coerce(Expenses.gross_value, db.BigInteger))
+            rows = db.session.query(Expenses.category, category_total).filter(
                 Expenses.company_id == company_id,
                 Expenses.transaction_type == 'despesa',
-                db.extract('month', Expenses.create_date) == current_month,
-                db.extract('year', Expenses.create_date) == current_year
-            ).all()
-            
-            expense_categories = {}
-            for expense in expenses:
-                category = expense.description.split(' ')[0] 
-                if category in expense_categories:
-                    expense_categories[category] += expense.gross_value
-                else:
-                    expense_categories[category] = expense.gross_value
+                Expenses.period == period_of(current_year, current_month)
+            ).group_by(Expenses.category).order_by(category_total.desc(), Expenses.category).all()
             
-            if len(expense_categories) < 3:
-                expense_categories = {
-                    'Materiais': 35,
-                    'Serviços': 25,
-                    'Equipamentos': 20,
-                    'Marketing': 15,
-                    'Outros': 5
-                }
+            # Categories past the top ones are folded into a single "others" slice
+            categories = {}
+            for index, (category, total) in enumerate(rows):
+                label = (category or OTHER_CATEGORY) if index < PIE_TOP_CATEGORIES else OTHER_CATEGORY
+                categories[label] = categories.get(label, 0) + int(total)
             
-            labels = list(expense_categories.keys())
-            data = list(expense_categories.values())
+            labels = list(categories.keys())
+            data = [from_cents(total) for total in categories.values()]
             
             colors = [
                 '#22c55e', '#3b82f6', '#f59e0b', 
@@ -1118,6 +1471,76 @@ def api_chart_data():
             'message': f'Erro ao buscar dados para o gráfico: {str(e)}'
         }), 500
     
+def transaction_data(transaction):
+    return {
+        'id': transaction.id,
+        'transaction_type': transaction.transaction_type,
+        'description': transaction.description,
+        'gross_value': transaction.gross_value,
+        'iva_rate': transaction.iva_rate,
+        'iva_value': transaction.iva_value,
+        'net_value': transaction.net_value,
+        'create_date': transaction.create_date.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def encode_transactions_cursor(transaction):
+    raw = f"{transaction.create_date_key}|{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_transactions_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    create_date_key, transaction_id = raw.rsplit('|', 1)
+    # A tampered date is rejected here with the other cursor errors instead of failing inside the query
+    datetime.fromisoformat(create_date_key)
+    return create_date_key, int(transaction_id)
+
+def transactions_cursor_key():
+    # SQLite keeps timestamps as text of mixed precision; compare the stored text so the cursor follows ORDER BY
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return type_coerce(Expenses.create_date, db.String)
+    return Expenses.create_date
+
+def fetch_transactions_page(query, after, limit):
+    create_date_key = transactions_cursor_key()
+    
+    if after:
+        after_date, after_id = after
+        if create_date_key is Expenses.create_date:
+            after_date = datetime.fromisoformat(after_date)
+        query = query.filter(or_(
+            create_date_key < after_date,
+            and_(create_date_key == after_date, Expenses.id < after_id)
+        ))
+    
+    return query.with_entities(
+        Expenses.id,
+        Expenses.transaction_type,
+        Expenses.description,
+        Expenses.gross_value,
+        Expenses.iva_rate,
+        Expenses.iva_value,
+        Expenses.net_value,
+        Expenses.create_date,
+        create_date_key.label('create_date_key')
+    ).order_by(Expenses.create_date.desc(), Expenses.id.desc()).limit(limit).all()
+
+def stream_transactions(query, after):
+    yield '{"success": true, "transactions": ['
+    
+    first = True
+    while True:
+        chunk = fetch_transactions_page(query, after, TRANSACTIONS_CHUNK_SIZE)
+        
+        for transaction in chunk:
+            yield ('' if first else ',') + app.json.dumps(transaction_data(transaction))
+            first = False
+        
+        if len(chunk) < TRANSACTIONS_CHUNK_SIZE:
+            break
+        after = (str(chunk[-1].create_date_key), chunk[-1].id)
+    
+    yield ']}'
+
 @app.route('/api/transactions')
 @login_required
 def get_transactions():
@@ -1126,40 +1549,56 @@ def get_transactions():
         month = request.args.get('month', type=int)
         year = request.args.get('year', type=int)
         transaction_type = request.args.get('type')
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('after')
+        stream = request.args.get('stream', type=int)
         
-        if not all([company_id, month, year]):
+        if not all([company_id, month, year]) or (limit is not None and limit <= 0):
             return jsonify({
                 'success': False,
                 'message': 'Parâmetros inválidos'
             }), 400
         
+        after = None
+        if cursor:
+            try:
+                after = decode_transactions_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({
+                    'success': False,
+                    'message': 'Cursor inválido'
+                }), 400
+        
         query = Expenses.query.filter(
             Expenses.company_id == company_id,
-            db.extract('month', Expenses.create_date) == month,
-            db.extract('year', Expenses.create_date) == year
+            Expenses.period == period_of(year, month)
         )
         
         if transaction_type:
             query = query.filter(Expenses.transaction_type.ilike(f'%{transaction_type}%'))
+        
+        if stream:
+            return Response(stream_with_context(stream_transactions(query, after)), mimetype='application/json')
+        
+        if limit is None:
+            transactions = query.order_by(Expenses.create_date.desc()).execution_options(
+                stream_results=True
+            ).yield_per(TRANSACTIONS_CHUNK_SIZE)
             
-        transactions = query.order_by(Expenses.create_date.desc()).all()
-        
-        transaction_list = []
-        for transaction in transactions:
-            transaction_list.append({
-                'id': transaction.id,
-                'transaction_type': transaction.transaction_type,
-                'description': transaction.description,
-                'gross_value': transaction.gross_value,
-                'iva_rate': transaction.iva_rate,
-                'iva_value': transaction.iva_value,
-                'net_value': transaction.net_value,
-                'create_date': transaction.create_date.strftime("%Y-%m-%d %H:%M:%S")
+            return jsonify({
+                'success': True,
+                'transactions': [transaction_data(transaction) for transaction in transactions]
             })
         
+        limit = min(limit, MAX_TRANSACTIONS_PAGE_SIZE)
+        transactions = fetch_transactions_page(query, after, limit + 1)
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
+        
         return jsonify({
             'success': True,
-            'transactions': transaction_list
+            'transactions': [transaction_data(transaction) for transaction in transactions],
+            'next_cursor': encode_transactions_cursor(transactions[-1]) if has_more else None
         })
         
     except Exception as e:
@@ -1168,6 +1607,53 @@ def get_transactions():
             'message': f'Erro ao buscar transações: {str(e)}'
         }), 500
     
+@app.route('/export-expenses')
+@login_required
+def export_expenses():
+    company_id = request.args.get('company_id', type=int)
+    denied = company_access_denied(company_id)
+    if denied:
+        return denied
+    
+    try:
+        export_format = request.args.get('format', 'csv')
+        transaction_type = request.args.get('type')
+        
+        try:
+            start_date = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            start_date = end_date = None
+        
+        if not company_id or not start_date or start_date > end_date or export_format not in ['csv', 'xlsx']:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos'
+            }), 400
+        
+        query = export_query(company_id, start_date, end_date, transaction_type)
+        filename = f"transacoes_{company_id}_{start_date.isoformat()}_{end_date.isoformat()}.{export_format}"
+        
+        if export_format == 'xlsx':
+            return send_file(
+                write_xlsx(query),
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=filename
+            )
+        
+        return Response(
+            stream_with_context(iter_csv(query)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao exportar transações: {str(e)}'
+        }), 500
+    
 @app.route('/simple-sales/<int:company_id>')
 @login_required
 def simple_sales(company_id):
@@ -1185,10 +1671,7 @@ def simple_sales(company_id):
     query = SimpleExpenses.query.filter_by(company_id=company_id)
     
     if month and year:
-        query = query.filter(
-            db.extract('month', SimpleExpenses.create_date) == month,
-            db.extract('year', SimpleExpenses.create_date) == year
-        )
+        query = query.filter(SimpleExpenses.period == period_of(year, month))
     
     pagination = query.order_by(SimpleExpenses.create_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
     all_expenses = pagination.items
@@ -1234,11 +1717,9 @@ def add_simple_expense():
             company_id=int(company_id) 
         )
         
-        db.session.add(new_expense)
+        add_ledger_entry(new_expense)
         db.session.commit()
         
-        update_simple_monthly_summary(new_expense)
-        
         flash('✅ Transação adicionada com sucesso!', 'success')
         return redirect(url_for('simple_sales', company_id=company_id))
         
@@ -1252,37 +1733,6 @@ def add_simple_expense():
             flash(f'❌ Erro ao adicionar transação: {str(e)}', 'error')
             return redirect(url_for('company'))
         
-def update_simple_monthly_summary(expense):
-    transaction_date = expense.create_date
-    month = transaction_date.month
-    year = transaction_date.year
-    
-    summary = SimpleMonthlySummary.query.filter_by(
-        month=month, 
-        year=year,
-        company_id=expense.company_id
-    ).first()
-    
-    if not summary:
-        summary = SimpleMonthlySummary(
-            month=month,
-            year=year,
-            company_id=expense.company_id
-        )
-        db.session.add(summary)
-    
-    if expense.transaction_type.lower() == 'ganho':
-        summary.total_sales += expense.gross_value
-        summary.total_sales_without_vat += expense.net_value
-        summary.total_vat += expense.iva_value
-    elif expense.transaction_type.lower() == 'despesa':
-        summary.total_costs += expense.gross_value
-    
-    summary.profit = summary.total_sales - summary.total_costs
-    summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs
-    
-    db.session.commit()
-
 @app.route('/delete-simple-expense/<int:expense_id>', methods=['POST'])
 @login_required
 def delete_simple_expense(expense_id):
@@ -1292,54 +1742,17 @@ def delete_simple_expense(expense_id):
         if expense.user_id != current_user.id:
             return jsonify({'success': False, 'message': 'Acesso negado'}), 403
         
-        transaction_type = expense.transaction_type
-        gross_value = expense.gross_value
-        net_value = expense.net_value
-        iva_value = expense.iva_value
         company_id = expense.company_id
-        transaction_date = expense.create_date
         
-        db.session.delete(expense)
+        delete_ledger_entry(expense)
         db.session.commit()
         
-        remove_from_simple_monthly_summary(
-            transaction_date,
-            company_id,
-            transaction_type,
-            gross_value,
-            net_value,
-            iva_value
-        )
-        
         return jsonify({'success': True, 'company_id': company_id}), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
-def remove_from_simple_monthly_summary(date, company_id, transaction_type, gross_value, net_value, iva_value):
-    month = date.month
-    year = date.year
-    
-    summary = SimpleMonthlySummary.query.filter_by(
-        month=month, 
-        year=year,
-        company_id=company_id
-    ).first()
-    
-    if summary:
-        if transaction_type.lower() == 'ganho':
-            summary.total_sales -= gross_value
-            summary.total_sales_without_vat -= net_value
-            summary.total_vat -= iva_value
-        elif transaction_type.lower() == 'despesa':
-            summary.total_costs -= gross_value
-        
-        summary.profit = summary.total_sales - summary.total_costs
-        summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs
-        
-        db.session.commit()
-
 @app.route('/get-simple-expense/<int:expense_id>')
 @login_required
 def get_simple_expense(expense_id):
@@ -1376,27 +1789,16 @@ def update_simple_expense(expense_id):
             flash('❌ Você não tem permissão para editar esta transação.', 'error')
             return redirect(url_for('simple_sales', company_id=company_id))
         
-        old_transaction_type = expense.transaction_type
-        old_gross_value = expense.gross_value
-        old_net_value = expense.net_value
-        old_iva_value = expense.iva_value
-        
-        expense.transaction_type = request.form.get('transaction_type')
-        expense.description = request.form.get('description')
-        expense.gross_value = float(request.form.get('gross_value'))
-        expense.iva_rate = float(request.form.get('iva_rate'))
-        expense.iva_value = float(request.form.get('iva_value'))
-        expense.net_value = float(request.form.get('net_value'))
-        
-        db.session.commit()
-        
-        adjust_simple_monthly_summary(
+        update_ledger_entry(
             expense,
-            old_transaction_type,
-            old_gross_value,
-            old_net_value,
-            old_iva_value
+            transaction_type=request.form.get('transaction_type'),
+            description=request.form.get('description'),
+            gross_value=float(request.form.get('gross_value')),
+            iva_rate=float(request.form.get('iva_rate')),
+            iva_value=float(request.form.get('iva_value')),
+            net_value=float(request.form.get('net_value'))
         )
+        db.session.commit()
         
         flash('✅ Transação atualizada com sucesso!', 'success')
         return redirect(url_for('simple_sales', company_id=company_id))
@@ -1415,53 +1817,9 @@ def update_simple_expense(expense_id):
         else:
             return redirect(url_for('company'))
 
-def adjust_simple_monthly_summary(expense, old_type, old_gross, old_net, old_iva):
-    transaction_date = expense.create_date
-    month = transaction_date.month
-    year = transaction_date.year
-    
-    summary = SimpleMonthlySummary.query.filter_by(
-        month=month, 
-        year=year,
-        company_id=expense.company_id
-    ).first()
-    
-    if not summary:
-        summary = SimpleMonthlySummary(
-            month=month,
-            year=year,
-            company_id=expense.company_id
-        )
-        db.session.add(summary)
-        
-        if expense.transaction_type.lower() == 'ganho':
-            summary.total_sales += expense.gross_value
-            summary.total_sales_without_vat += expense.net_value
-            summary.total_vat += expense.iva_value
-        elif expense.transaction_type.lower() == 'despesa':
-            summary.total_costs += expense.gross_value
-    else:
-        if old_type.lower() == 'ganho':
-            summary.total_sales -= old_gross
-            summary.total_sales_without_vat -= old_net
-            summary.total_vat -= old_iva
-        elif old_type.lower() == 'despesa':
-            summary.total_costs -= old_gross
-        
-        if expense.transaction_type.lower() == 'ganho':
-            summary.total_sales += expense.gross_value
-            summary.total_sales_without_vat += expense.net_value
-            summary.total_vat += expense.iva_value
-        elif expense.transaction_type.lower() == 'despesa':
-            summary.total_costs += expense.gross_value
-    
-    summary.profit = summary.total_sales - summary.total_costs
-    summary.profit_without_vat = summary.total_sales_without_vat - summary.total_costs
-    
-    db.session.commit()
-
 @app.route('/api/simple-financial-summary')
 @login_required
+@versioned_response(simple_financial_summary_version)
 def api_simple_financial_summary():
     try:
         company_id = request.args.get('company_id', type=int)
@@ -1474,49 +1832,12 @@ def api_simple_financial_summary():
                 'message': 'Parâmetros inválidos'
             }), 400
             
-        summary = SimpleMonthlySummary.query.filter_by(
-            company_id=company_id,
-            month=month,
-            year=year
-        ).first()
+        summary = materialize_summary(SimpleMonthlySummary, company_id, year, month)
         
-        if not summary:
-            expenses = SimpleExpenses.query.filter(
-                SimpleExpenses.company_id == company_id,
-                db.extract('month', SimpleExpenses.create_date) == month,
-                db.extract('year', SimpleExpenses.create_date) == year
-            ).all()
-            
-            total_sales = 0.0
-            total_sales_without_vat = 0.0
-            total_vat = 0.0
-            total_costs = 0.0
-            
-            for expense in expenses:
-                if expense.transaction_type.lower() == 'ganho':
-                    total_sales += expense.gross_value
-                    total_sales_without_vat += expense.net_value
-                    total_vat += expense.iva_value
-                elif expense.transaction_type.lower() == 'despesa':
-                    total_costs += expense.gross_value
-            
-            summary_data = {
-                'total_sales': total_sales,
-                'total_sales_without_vat': total_sales_without_vat,
-                'total_vat': total_vat,
-                'total_costs': total_costs,
-                'profit': total_sales - total_costs,
-                'profit_without_vat': total_sales_without_vat - total_costs
-            }
+        if summary:
+            summary_data = {field: getattr(summary, field) for field in SIMPLE_FIELDS}
         else:
-            summary_data = {
-                'total_sales': summary.total_sales,
-                'total_sales_without_vat': summary.total_sales_without_vat,
-                'total_vat': summary.total_vat,
-                'total_costs': summary.total_costs,
-                'profit': summary.profit,
-                'profit_without_vat': summary.profit_without_vat
-            }
+            summary_data = dict.fromkeys(SIMPLE_FIELDS, 0.0)
         
         prev_month = month - 1
         prev_year = year
@@ -1555,6 +1876,78 @@ def api_simple_financial_summary():
             'message': f'Erro ao buscar dados financeiros: {str(e)}'
         }), 500
     
+@app.route('/api/summaries/reconcile', methods=['POST'])
+@login_required
+def api_reconcile_summaries():
+    try:
+        if current_user.type != "Admin":
+            return jsonify({
+                'success': False,
+                'message': 'Apenas administradores podem recalcular resumos.'
+            }), 403
+        
+        repair = request.form.get('repair', '').lower() == 'true'
+        company_id = request.form.get('company_id', type=int)
+        
+        job_id = enqueue_job('reconcile_summaries', {
+            'repair': repair,
+            'company_id': company_id
+        }, user_id=current_user.id, company_id=company_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Verificação de resumos em curso.',
+            'job_id': job_id
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao recalcular resumos: {str(e)}'
+        }), 500
+    
+@app.route('/api/jobs')
+@login_required
+def api_jobs():
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        jobs = BackgroundJob.query.filter_by(user_id=current_user.id).order_by(BackgroundJob.create_date.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'jobs': [job_data(job) for job in jobs]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar tarefas: {str(e)}'
+        }), 500
+    
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job_status(job_id):
+    try:
+        job = db.session.get(BackgroundJob, job_id)
+        
+        if not job or (job.user_id != current_user.id and current_user.type != "Admin"):
+            return jsonify({
+                'success': False,
+                'message': 'Tarefa não encontrada.'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job_data(job)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar tarefa: {str(e)}'
+        }), 500
+    
 @app.route('/settings/<company_id>')
 @login_required
 def settings(company_id):    
@@ -1566,6 +1959,7 @@ def settings(company_id):
 
 @app.route('/get-settings/<company_id>')
 @login_required
+@versioned_response(settings_version)
 def get_settings(company_id):
     try:
         company = Company.query.get_or_404(company_id)
@@ -1623,9 +2017,12 @@ def save_settings():
         settings.rent_value = float(request.form.get('rent_value', 0.0))
         settings.employee_insurance_value = float(request.form.get('employee_insurance_value', 0.0))
         settings.preferred_salary_expense_day = int(request.form.get('preferred_salary_expense_day', 1))
+        settings.version = (settings.version or 0) + 1
         
         db.session.commit()
         
+        schedule_company_salaries(settings.company_id, settings.preferred_salary_expense_day)
+        
         return jsonify({
             'success': True,
             'message': 'Configurações salvas com sucesso!'
@@ -1771,16 +2168,13 @@ def smodal():
 
 if __name__ == '__main__':
     with app.app_context():
-        db_path = os.path.join(basedir, 'instance', 'test.db')
-        db_exists = os.path.isfile(db_path)
+        db_exists = inspect(db.engine).has_table(Expenses.__tablename__)
         if not db_exists:
             db.create_all()
             
-        try:
-            run_auto_migration(app)
-        except Exception as e:
-            print("Continuing with initialization...")
+        run_migrations(app, created=not db_exists)
         
         install_core()
+        start_job_workers(app)
         start_day_checker(app)
     app.run(debug=True, host='0.0.0.0', port=4000)
\ No newline at end of file
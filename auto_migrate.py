@@ -1,12 +1,17 @@
-from flask_migrate import upgrade, migrate, init, stamp
-import os
+from flask_migrate import upgrade, stamp
+from sqlalchemy import inspect
+from extensions import db
 
-def run_auto_migration(app):
+# Databases created before the migration history was committed still have exactly this schema
+BASELINE_REVISION = '7bf72903651e'
+
+def run_migrations(app, created=False):
     with app.app_context():
-        if not os.path.exists('migrations'):
-            init()
+        if created:
             stamp()
-        print("Generating and applying automatic migration...")
-        migrate(message="auto migration")
+        elif not inspect(db.engine).has_table('alembic_version'):
+            stamp(revision=BASELINE_REVISION)
+        
+        print("Applying database migrations...")
         upgrade()
-        print("Migration completed.")
\ No newline at end of file
+        print("Migration completed.")
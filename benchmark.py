@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tracemalloc
+import statistics
+
+DEFAULT_DATABASE = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'benchmark.db')
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def build_scenarios(app, client, company_ids, rng):
+    from salary_automation import check_and_process_salaries
+    
+    today = datetime.date.today()
+    
+    def random_company():
+        return rng.choice(company_ids)
+    
+    def random_month():
+        return rng.randint(1, today.month)
+    
+    def get(path):
+        response = client.get(path)
+        response.get_data()
+        return response
+    
+    return [
+        ('financial_summary', lambda: get(
+            f"/api/financial-summary?company_id={random_company()}&month={random_month()}&year={today.year}")),
+        ('chart_data_bar', lambda: get(
+            f"/api/chart-data?company_id={random_company()}&type=bar&month={today.month}&year={today.year}&months=12")),
+        ('chart_data_pie', lambda: get(
+            f"/api/chart-data?company_id={random_company()}&type=pie&month={random_month()}&year={today.year}")),
+        ('transactions_page', lambda: get(
+            f"/api/transactions?company_id={random_company()}&month={random_month()}&year={today.year}&limit=100")),
+        ('transactions_stream', lambda: get(
+            f"/api/transactions?company_id={random_company()}&month={random_month()}&year={today.year}&stream=1")),
+        ('expenses_page', lambda: get(f"/expenses/{random_company()}?page={rng.randint(1, 5)}")),
+        ('add_expense', lambda: client.post('/add-expenses', data={
+            'company_id': random_company(),
+            'transaction_type': rng.choice(['ganho', 'despesa']),
+            'description': 'Benchmark',
+            'gross_value': '123.00',
+            'iva_rate': '23',
+            'iva_value': '23.00',
+            'net_value': '100.00'
+        })),
+        ('check_and_process_salaries', lambda: check_and_process_salaries(app)),
+    ]
+
+def run_scenario(action, iterations, query_counter):
+    latencies = []
+    queries = []
+    statuses = {}
+    
+    for _ in range(iterations):
+        query_counter[0] = 0
+        started = time.perf_counter()
+        result = action()
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(query_counter[0])
+        
+        status = str(getattr(result, 'status_code', 'ok'))
+        statuses[status] = statuses.get(status, 0) + 1
+    
+    # Peak memory comes from a separate traced call, so tracing does not skew the latencies
+    tracemalloc.start()
+    action()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': statuses
+    }
+
+def run_benchmarks(database, iterations, seed, generate, dataset, only=None):
+    # The database has to be chosen before the app module creates its engine
+    os.environ['DATABASE_URL'] = f"sqlite:///{database}"
+    
+    from sqlalchemy import event
+    from app import app
+    from extensions import db
+    from instance.base import Company
+    from instance.install_core import install_core
+    from benchmark_data import generate_dataset
+    
+    with app.app_context():
+        db.create_all()
+        install_core()
+        if generate:
+            generate_dataset(seed=seed, **dataset)
+        company_ids = [company_id for company_id, in db.session.query(Company.id).filter(Company.is_active == True)]
+    
+    if not company_ids:
+        raise SystemExit("A base de dados não tem empresas; use --generate.")
+    
+    query_counter = [0]
+    
+    def count_query(*args):
+        query_counter[0] += 1
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+    
+    client = app.test_client()
+    client.post('/login', data={'username': 'cubix', 'password': 'cubix1@'})
+    
+    rng = random.Random(seed)
+    results = {}
+    for name, action in build_scenarios(app, client, company_ids, rng):
+        if only and name not in only:
+            continue
+        results[name] = run_scenario(action, iterations, query_counter)
+    
+    return {
+        'database': database,
+        'companies': len(company_ids),
+        'iterations': iterations,
+        'seed': seed,
+        'python': sys.version.split()[0],
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'scenarios': results
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Medir a latência dos principais endpoints com o cliente de testes do Flask.")
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help="Ficheiro SQLite de teste (nunca a base de dados de produção)")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--generate', action='store_true', help="Gerar dados sintéticos antes de medir")
+    parser.add_argument('--companies', type=int, default=10)
+    parser.add_argument('--employees', type=int, default=8)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--transactions-per-month', type=int, default=120)
+    parser.add_argument('--simple-per-month', type=int, default=60)
+    parser.add_argument('--only', nargs='*', help="Executar apenas os cenários indicados")
+    parser.add_argument('--output', help="Guardar o relatório JSON neste ficheiro")
+    args = parser.parse_args()
+    
+    report = run_benchmarks(
+        os.path.abspath(args.database),
+        args.iterations,
+        args.seed,
+        args.generate,
+        {
+            'companies': args.companies,
+            'employees': args.employees,
+            'years': args.years,
+            'transactions_per_month': args.transactions_per_month,
+            'simple_per_month': args.simple_per_month
+        },
+        args.only
+    )
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
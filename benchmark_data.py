@@ -0,0 +1,198 @@
+import random
+import logging
+import argparse
+import datetime
+import calendar
+from sqlalchemy import insert
+from instance.base import (
+    User, Company, Employee, Settings, Expenses, SimpleExpenses, LOCAL_TIMEZONE,
+    period_from_utc, local_day_from_utc, to_cents, from_cents, SOURCE_SALARY, FIXED_EXPENSE_SOURCES
+)
+from summary_rebuild import reconcile_summaries
+from extensions import db
+
+logger = logging.getLogger('benchmark_data')
+logger.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+INSERT_BATCH_SIZE = 5000
+
+IVA_RATES = [23.0, 13.0, 6.0, 0.0]
+IVA_WEIGHTS = [70, 10, 12, 8]
+SALE_DESCRIPTIONS = ['Venda balcão', 'Fatura cliente', 'Serviço de consultoria', 'Venda online', 'Prestação de serviços']
+COST_DESCRIPTIONS = [
+    'Fornecedor de mercadorias', 'Eletricidade', 'Água', 'Internet e telecomunicações', 'Combustível',
+    'Material de escritório', 'Manutenção', 'Publicidade', 'Contabilidade', 'Transporte e logística'
+]
+POSITIONS = ['Operador', 'Técnico', 'Comercial', 'Administrativo', 'Gestor']
+FIRST_NAMES = ['Ana', 'João', 'Maria', 'Pedro', 'Inês', 'Rui', 'Sofia', 'Tiago', 'Marta', 'Luís', 'Carla', 'Nuno']
+LAST_NAMES = ['Silva', 'Santos', 'Ferreira', 'Pereira', 'Oliveira', 'Costa', 'Rodrigues', 'Martins', 'Sousa', 'Gomes']
+
+def month_range(years, today):
+    year, month = today.year - years + 1, 1
+    while (year, month) <= (today.year, today.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def random_utc_date(rng, year, month):
+    day = rng.randint(1, calendar.monthrange(year, month)[1])
+    local = LOCAL_TIMEZONE.localize(datetime.datetime(year, month, day, rng.randint(8, 19), rng.randint(0, 59), rng.randint(0, 59)))
+    return local.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def random_amount(rng, median, sigma=0.8):
+    return from_cents(max(to_cents(rng.lognormvariate(0, sigma) * median), 1))
+
+def ledger_row(rng, company_id, user_id, transaction_type, description, gross_value, create_date, iva_rate=None):
+    if iva_rate is None:
+        iva_rate = rng.choices(IVA_RATES, IVA_WEIGHTS)[0]
+    
+    gross_cents = to_cents(gross_value)
+    net_cents = round(gross_cents * 100 / (100 + iva_rate))
+    return {
+        'transaction_type': transaction_type,
+        'description': description,
+        'gross_value': gross_value,
+        'iva_rate': iva_rate,
+        'iva_value': from_cents(gross_cents - net_cents),
+        'net_value': from_cents(net_cents),
+        'company_id': company_id,
+        'user_id': user_id,
+        'create_date': create_date,
+        'period': period_from_utc(create_date),
+        'local_day': local_day_from_utc(create_date)
+    }
+
+def month_ledger(rng, company, employees, settings, user_id, year, month, transactions_per_month):
+    rows = []
+    # Sales skew towards a seasonal peak in the summer and December
+    seasonal = 1.3 if month in (7, 8, 12) else 1.0
+    count = max(int(rng.gauss(transactions_per_month, transactions_per_month * 0.2)), 0)
+    
+    for _ in range(count):
+        create_date = random_utc_date(rng, year, month)
+        if rng.random() < 0.45:
+            rows.append(ledger_row(rng, company.id, user_id, 'ganho', rng.choice(SALE_DESCRIPTIONS),
+                                   random_amount(rng, 180 * seasonal), create_date))
+        else:
+            rows.append(ledger_row(rng, company.id, user_id, 'despesa', rng.choice(COST_DESCRIPTIONS),
+                                   random_amount(rng, 90), create_date))
+    
+    salary_date = random_utc_date(rng, year, month)
+    for employee in employees:
+        row = ledger_row(rng, company.id, user_id, 'despesa', f"Salário: {employee.name} - {employee.position}",
+                         employee.gross_salary, salary_date, 0.0)
+        row.update(source_kind=SOURCE_SALARY, source_period=row['period'], source_ref=employee.id)
+        rows.append(row)
+    
+    fixed_values = {
+        'rent': (settings.rent_value, 23.0),
+        'employee_insurance': (settings.employee_insurance_value, 0.0),
+        'company_insurance': (settings.total_insurance_value, 0.0),
+        'other_fixed': (settings.other_expenses, 0.0)
+    }
+    for kind, (value, iva_rate) in fixed_values.items():
+        if value > 0:
+            row = ledger_row(rng, company.id, user_id, 'despesa', FIXED_EXPENSE_SOURCES[kind], value, salary_date, iva_rate)
+            row.update(source_kind=kind, source_period=row['period'], source_ref=0)
+            rows.append(row)
+    
+    return rows
+
+def simple_month_ledger(rng, company_id, user_id, year, month, transactions_per_month):
+    rows = []
+    for _ in range(max(int(rng.gauss(transactions_per_month, transactions_per_month * 0.2)), 0)):
+        create_date = random_utc_date(rng, year, month)
+        if rng.random() < 0.7:
+            rows.append(ledger_row(rng, company_id, user_id, 'ganho', 'Venda simples', random_amount(rng, 25), create_date))
+        else:
+            rows.append(ledger_row(rng, company_id, user_id, 'despesa', 'Compra simples', random_amount(rng, 15), create_date))
+    return rows
+
+def flush_rows(model, rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + INSERT_BATCH_SIZE])
+    db.session.commit()
+
+def generate_dataset(companies=10, employees=8, years=3, transactions_per_month=120, simple_per_month=60, seed=42, username='cubix'):
+    rng = random.Random(seed)
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise ValueError(f"Utilizador inexistente: {username}")
+    
+    today = datetime.date.today()
+    counts = {'companies': 0, 'employees': 0, 'expenses': 0, 'simple_expenses': 0}
+    
+    for index in range(companies):
+        company = Company(name=f"Empresa Benchmark {index + 1:04d}", location='Lisboa', relationship_type='cliente',
+                          user_id=user.id, tax_id=f"5{rng.randint(10000000, 99999999)}")
+        db.session.add(company)
+        db.session.flush()
+        
+        settings = Settings(
+            company_id=company.id,
+            rent_value=from_cents(rng.randint(500, 3000) * 100),
+            employee_insurance_value=from_cents(rng.randint(20, 80) * 100),
+            total_insurance_value=from_cents(rng.randint(50, 300) * 100),
+            other_expenses=from_cents(rng.randint(0, 500) * 100),
+            preferred_salary_expense_day=rng.choice([1, 15, 25, 28, 99])
+        )
+        db.session.add(settings)
+        
+        company_employees = []
+        for _ in range(max(int(rng.gauss(employees, employees * 0.3)), 1)):
+            employee = Employee(
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(1, 999)}",
+                gross_salary=from_cents(to_cents(rng.lognormvariate(0, 0.35) * 1100)),
+                position=rng.choice(POSITIONS),
+                company_id=company.id,
+                social_security_rate=11.0,
+                employer_social_security_rate=23.75,
+                irs_rate=rng.choice([0.0, 8.0, 12.5, 16.0])
+            )
+            db.session.add(employee)
+            company_employees.append(employee)
+        db.session.flush()
+        
+        rows = []
+        simple_rows = []
+        for year, month in month_range(years, today):
+            rows.extend(month_ledger(rng, company, company_employees, settings, user.id, year, month, transactions_per_month))
+            simple_rows.extend(simple_month_ledger(rng, company.id, user.id, year, month, simple_per_month))
+        
+        db.session.commit()
+        flush_rows(Expenses, rows)
+        flush_rows(SimpleExpenses, simple_rows)
+        
+        counts['companies'] += 1
+        counts['employees'] += len(company_employees)
+        counts['expenses'] += len(rows)
+        counts['simple_expenses'] += len(simple_rows)
+        logger.info(f"Empresa {company.id}: {len(rows)} transações, {len(simple_rows)} vendas simples")
+    
+    # Summaries are rebuilt from the generated ledger in one pass rather than per row
+    reconcile_summaries(repair=True)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerar dados sintéticos numa base de dados de teste.")
+    parser.add_argument('--companies', type=int, default=10)
+    parser.add_argument('--employees', type=int, default=8, help="Média de funcionários por empresa")
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--transactions-per-month', type=int, default=120)
+    parser.add_argument('--simple-per-month', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    from app import app
+    from instance.install_core import install_core
+    
+    with app.app_context():
+        db.create_all()
+        install_core()
+        counts = generate_dataset(args.companies, args.employees, args.years, args.transactions_per_month,
+                                  args.simple_per_month, args.seed)
+    
+    print(counts)
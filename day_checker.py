@@ -1,8 +1,16 @@
-import threading
 import time
 import datetime
 import logging
-from salary_automation import check_and_process_salaries
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.triggers.cron import CronTrigger
+from extensions import db
+from instance.base import Company, Settings, LOCAL_TIMEZONE
+from salary_automation import get_salary_day
+from job_queue import enqueue_job, start_job_workers
+from storage_profile import schedule_storage_maintenance
 
 logger = logging.getLogger('day_checker')
 logger.setLevel(logging.INFO)
@@ -11,30 +19,116 @@ handler = logging.StreamHandler()
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-def print_current_day_loop(app=None):
+SALARY_JOB_PREFIX = 'salary-company-'
+
+scheduler = None
+scheduler_app = None
+
+def salary_job_id(company_id):
+    return f"{SALARY_JOB_PREFIX}{company_id}"
+
+def salary_trigger(preferred_day):
+    day = 'last' if preferred_day == 99 else min(preferred_day, 28)
+    return CronTrigger(day=day, hour=0, minute=0, timezone=LOCAL_TIMEZONE)
+
+def scheduled_salary_date(preferred_day, today):
+    # The latest salary day up to today is the run being executed, even when it fires late or coalesced
+    salary_day = get_salary_day(preferred_day, today.year, today.month)
+    if today.day >= salary_day:
+        return today.replace(day=salary_day)
+    
+    previous = today.replace(day=1) - datetime.timedelta(days=1)
+    return previous.replace(day=get_salary_day(preferred_day, previous.year, previous.month))
+
+def run_salary_job(company_id, preferred_day):
+    run_date = scheduled_salary_date(preferred_day, datetime.datetime.now(LOCAL_TIMEZONE).date())
+    
+    # The posting itself runs in the job queue, which retries it and keeps its report
+    with scheduler_app.app_context():
+        try:
+            enqueue_job('process_company_expenses', {
+                'company_id': company_id,
+                'date': datetime.datetime.combine(run_date, datetime.time()).isoformat()
+            }, company_id=company_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao agendar despesas fixas da empresa {company_id}: {str(e)}")
+        finally:
+            db.session.remove()
+
+def schedule_company_salaries(company_id, preferred_day):
+    if scheduler is None:
+        return None
+    
+    job = scheduler.add_job(
+        run_salary_job,
+        trigger=salary_trigger(preferred_day),
+        args=[company_id, preferred_day],
+        id=salary_job_id(company_id),
+        replace_existing=True,
+        misfire_grace_time=None,
+        coalesce=True
+    )
+    logger.info(f"Próximo lançamento de despesas fixas da empresa {company_id}: {job.next_run_time}")
+    
+    # The cron trigger only fires from its next occurrence, so a company scheduled on its salary day still gets today's run;
+    # postings already made for the period are skipped by their source reference
+    today = datetime.datetime.now(LOCAL_TIMEZONE).date()
+    if today.day == get_salary_day(preferred_day, today.year, today.month):
+        scheduler.add_job(run_salary_job, args=[company_id, preferred_day], id=f"{job.id}-now", replace_existing=True, misfire_grace_time=None)
     
-    while True:
-        current_date = datetime.datetime.now()
-        print(f"\nData atual: {current_date.strftime('%d/%m/%Y %H:%M:%S')}")
-        print(f"Dia do mês: {current_date.day}")
+    return job.next_run_time
+
+def sync_salary_jobs():
+    companies = db.session.query(Company.id, Settings.preferred_salary_expense_day).join(
+        Settings, Settings.company_id == Company.id
+    ).filter(Company.is_active == True).all()
+    
+    wanted = {salary_job_id(company_id): (company_id, preferred_day) for company_id, preferred_day in companies}
+    
+    for job in scheduler.get_jobs():
+        if job.id.startswith(SALARY_JOB_PREFIX) and job.id not in wanted:
+            job.remove()
+    
+    for job_id, (company_id, preferred_day) in wanted.items():
+        job = scheduler.get_job(job_id)
         
-        if app:
-            check_and_process_salaries(app)
+        if job and tuple(job.args) == (company_id, preferred_day) and str(job.trigger) == str(salary_trigger(preferred_day)):
+            continue
         
-        time.sleep(10) 
+        schedule_company_salaries(company_id, preferred_day)
 
 def start_day_checker(app=None):
-    day_checker_thread = threading.Thread(target=print_current_day_loop, args=(app,))
-    day_checker_thread.daemon = True
-    day_checker_thread.start()
-    logger.info("Verificador de data iniciado em segundo plano.")
-    return day_checker_thread
+    global scheduler, scheduler_app
+    
+    scheduler_app = app
+    
+    with app.app_context():
+        scheduler = BackgroundScheduler(
+            jobstores={'default': SQLAlchemyJobStore(engine=db.engine), 'memory': MemoryJobStore()},
+            executors={'default': ThreadPoolExecutor(1)},
+            timezone=LOCAL_TIMEZONE
+        )
+        scheduler.start(paused=True)
+        sync_salary_jobs()
+        schedule_storage_maintenance(scheduler, app)
+        scheduler.resume()
+    
+    logger.info("Agendador de despesas fixas iniciado em segundo plano.")
+    return scheduler
 
 if __name__ == "__main__":
-    print("Executando verificador de data no modo independente.")
+    print("Executando agendador de despesas fixas no modo independente.")
     print("Pressione Ctrl+C para encerrar.")
     
+    from app import app
+    
+    start_job_workers(app)
+    start_day_checker(app)
+    
     try:
-        print_current_day_loop()
+        while True:
+            time.sleep(3600)
     except KeyboardInterrupt:
-        print("\nVerificador de data encerrado pelo usuário.")
\ No newline at end of file
+        scheduler.shutdown()
+        print("\nAgendador de despesas fixas encerrado pelo usuário.")
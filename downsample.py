@@ -0,0 +1,53 @@
+import numpy as np
+
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, per bucket, the point forming
+# the largest triangle with the previously kept point and the average of the next bucket
+def lttb_indices(values, threshold):
+    y = np.asarray(values, dtype=float)
+    count = len(y)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+    
+    x = np.arange(count, dtype=float)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(int)
+    cumulative = np.concatenate(([0.0], np.cumsum(y)))
+    
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, count - 1
+    selected = 0
+    
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (count - 1, count)
+        
+        average_x = (next_start + next_end - 1) / 2
+        average_y = (cumulative[next_end] - cumulative[next_start]) / (next_end - next_start)
+        
+        areas = np.abs(
+            (x[selected] - average_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (average_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    
+    return indices
+
+def bucket_edges(count, buckets):
+    return np.linspace(0, count, min(buckets, count) + 1).astype(int)
+
+# Bars stand for totals, so consecutive points are added together instead of being dropped
+def bucket_sums(values, buckets):
+    values = np.asarray(values, dtype=float)
+    if buckets >= len(values):
+        return values.tolist()
+    return np.add.reduceat(values, bucket_edges(len(values), buckets)[:-1]).tolist()
+
+def bucket_labels(labels, buckets):
+    if buckets >= len(labels):
+        return list(labels)
+    
+    edges = bucket_edges(len(labels), buckets)
+    return [
+        labels[start] if end - start == 1 else f"{labels[start]} – {labels[end - 1]}"
+        for start, end in zip(edges[:-1], edges[1:])
+    ]
@@ -0,0 +1,159 @@
+from sqlalchemy import bindparam, or_, select, literal, type_coerce, BigInteger, func
+from instance.base import (
+    Expenses, Employee, MonthlySummary, QuarterlySummary, YearlySummary, DailySummary, Money,
+    expense_category, SOURCE_SALARY, FIXED_EXPENSE_SOURCES
+)
+from summary_rebuild import reconcile_summaries
+from extensions import db
+
+BACKFILL_BATCH_SIZE = 5000
+
+def match_expense_source(description, employees):
+    for kind, fixed_description in FIXED_EXPENSE_SOURCES.items():
+        if description == fixed_description:
+            return kind, 0
+    
+    # Salary descriptions are "Salário: {name} - {position}..."; longer names are tried first
+    for name, employee_id in employees:
+        if description.startswith(f"Salário: {name} - "):
+            return SOURCE_SALARY, employee_id
+    return None
+
+def backfill_expense_sources():
+    table = Expenses.__table__
+    statement = table.update().where(
+        table.c.id == bindparam('row_id')
+    ).values(
+        source_kind=bindparam('row_kind'),
+        source_period=bindparam('row_period'),
+        source_ref=bindparam('row_ref'),
+        write_date=table.c.write_date
+    )
+    
+    employees = {}
+    for company_id, name, employee_id in db.session.query(Employee.company_id, Employee.name, Employee.id).order_by(Employee.id):
+        employees.setdefault(company_id, []).append((name, employee_id))
+    for company_employees in employees.values():
+        company_employees.sort(key=lambda employee: len(employee[0]), reverse=True)
+    
+    used = set(db.session.query(Expenses.company_id, Expenses.source_kind, Expenses.source_period, Expenses.source_ref).filter(
+        Expenses.source_kind.isnot(None)
+    ))
+    
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Expenses.id, Expenses.company_id, Expenses.period, Expenses.description).filter(
+            Expenses.id > last_id,
+            Expenses.source_kind.is_(None),
+            Expenses.period.isnot(None),
+            Expenses.transaction_type == 'despesa',
+            or_(
+                Expenses.description.like('Salário:%'),
+                Expenses.description.in_(FIXED_EXPENSE_SOURCES.values())
+            )
+        ).order_by(Expenses.id).limit(BACKFILL_BATCH_SIZE).all()
+        
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        updates = []
+        for row in rows:
+            source = match_expense_source(row.description, employees.get(row.company_id, []))
+            if source is None:
+                continue
+            
+            # Duplicates after the first posting keep an empty source so the unique index still holds
+            key = (row.company_id, source[0], row.period, source[1])
+            if key in used:
+                continue
+            used.add(key)
+            updates.append({'row_id': row.id, 'row_kind': source[0], 'row_period': row.period, 'row_ref': source[1]})
+        
+        if updates:
+            db.session.execute(statement, updates)
+            db.session.commit()
+            total += len(updates)
+    
+    if total:
+        print(f"Backfilled source reference for {total} expenses rows")
+    return total
+
+def backfill_expense_categories():
+    table = Expenses.__table__
+    statement = table.update().where(
+        table.c.id == bindparam('row_id')
+    ).values(
+        category=bindparam('row_category'),
+        write_date=table.c.write_date
+    )
+    
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Expenses.id, Expenses.description).filter(
+            Expenses.id > last_id,
+            Expenses.category.is_(None)
+        ).order_by(Expenses.id).limit(BACKFILL_BATCH_SIZE).all()
+        
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        db.session.execute(statement, [
+            {'row_id': row.id, 'row_category': expense_category(row.description)}
+            for row in rows
+        ])
+        db.session.commit()
+        total += len(rows)
+    
+    if total:
+        print(f"Backfilled category for {total} expenses rows")
+    return total
+
+def backfill_summary_rollups():
+    # Rollups introduced after the monthly summaries start out as the sum of the existing months
+    amounts = [column.name for column in MonthlySummary.__table__.columns if isinstance(column.type, Money)]
+    monthly = MonthlySummary.__table__
+    
+    total = 0
+    for rollup, keys in [
+        (QuarterlySummary, {'year': monthly.c.year, 'quarter': (monthly.c.month - 1) // 3 + 1}),
+        (YearlySummary, {'year': monthly.c.year})
+    ]:
+        if db.session.query(rollup.id).first() is not None:
+            continue
+        
+        source = select(
+            monthly.c.company_id,
+            *[key.label(name) for name, key in keys.items()],
+            *[func.sum(type_coerce(monthly.c[name], BigInteger)).label(name) for name in amounts],
+            literal(1).label('version')
+        ).group_by(monthly.c.company_id, *keys.values())
+        
+        result = db.session.execute(rollup.__table__.insert().from_select(
+            ['company_id', *keys, *amounts, 'version'], source
+        ))
+        db.session.commit()
+        total += result.rowcount
+        
+        if result.rowcount:
+            print(f"Backfilled {result.rowcount} {rollup.__table__.name} rows")
+    return total
+
+def backfill_daily_summaries():
+    if db.session.query(DailySummary.id).first() is not None or db.session.query(Expenses.id).first() is None:
+        return 0
+    
+    # Missing days are exactly what the reconcile job repairs, so an empty table is filled through it
+    drift = reconcile_summaries(repair=True, only=['daily'])['daily']
+    if drift:
+        print(f"Backfilled {len(drift)} daily_summary rows")
+    return len(drift)
+
+def run_backfills():
+    backfill_expense_sources()
+    backfill_expense_categories()
+    backfill_summary_rollups()
+    backfill_daily_summaries()
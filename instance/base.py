@@ -1,9 +1,53 @@
 from datetime import datetime
-from sqlalchemy import func, event
-from pytz import timezone
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import func, event, BigInteger
+from sqlalchemy.types import TypeDecorator
+from pytz import timezone, utc
 from flask_login import UserMixin
 from extensions import db  
 
+LOCAL_TIMEZONE = timezone('Europe/Lisbon')
+
+def period_of(year, month):
+    return year * 100 + month
+
+def local_day_from_utc(date):
+    return utc.localize(date).astimezone(LOCAL_TIMEZONE).date()
+
+def utc_from_local(date):
+    return LOCAL_TIMEZONE.localize(date).astimezone(utc).replace(tzinfo=None)
+
+def period_from_utc(date):
+    local_date = local_day_from_utc(date)
+    return period_of(local_date.year, local_date.month)
+
+def split_period(period):
+    return divmod(period, 100)
+
+def quarter_of(month):
+    return (month - 1) // 3 + 1
+
+def to_cents(value):
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
+def from_cents(cents):
+    if cents is None:
+        return None
+    return int(cents) / 100
+
+# Amounts are euros in Python and integer cents in the database
+class Money(TypeDecorator):
+    impl = BigInteger
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return to_cents(value)
+    
+    def process_result_value(self, value, dialect):
+        return from_cents(value)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(25), unique=True)
@@ -25,20 +69,54 @@ class User(UserMixin, db.Model):
         self.active = active
         self.type = type
 
+# Automated postings carry a source reference; manual entries leave it empty
+SOURCE_SALARY = 'salary'
+FIXED_EXPENSE_SOURCES = {
+    'rent': "Renda mensal do espaço",
+    'employee_insurance': "Seguros dos Empregados",
+    'company_insurance': "Seguros da Empresa",
+    'other_fixed': "Outras Despesas Fixas"
+}
+
+# The expense chart groups on the first word of the description, stored so the database can aggregate it
+OTHER_CATEGORY = 'Outros'
+
+def expense_category(description):
+    words = (description or '').split()
+    if not words:
+        return OTHER_CATEGORY
+    return words[0].rstrip(':')[:50] or OTHER_CATEGORY
+
+def default_expense_category(context):
+    return expense_category(context.get_current_parameters().get('description'))
+
 class Expenses(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     transaction_type = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(255), nullable=False)
-    gross_value = db.Column(db.Float, nullable=False)
+    gross_value = db.Column(Money, nullable=False)
     iva_rate = db.Column(db.Float, nullable=False)
-    iva_value = db.Column(db.Float, nullable=False)
-    net_value = db.Column(db.Float, nullable=False)
+    iva_value = db.Column(Money, nullable=False)
+    net_value = db.Column(Money, nullable=False)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     company = db.relationship('Company', backref=db.backref('expenses', lazy=True))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref=db.backref('expenses', lazy=True))
     create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
     write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    period = db.Column(db.Integer)
+    local_day = db.Column(db.Date)
+    source_kind = db.Column(db.String(30))
+    source_period = db.Column(db.Integer)
+    source_ref = db.Column(db.Integer)
+    category = db.Column(db.String(50), default=default_expense_category)
+    
+    __table_args__ = (
+        db.Index('ix_expenses_company_period', 'company_id', 'period', 'create_date'),
+        db.Index('ix_expenses_source', 'company_id', 'source_kind', 'source_period', 'source_ref', unique=True),
+        db.Index('ix_expenses_category', 'company_id', 'period', 'transaction_type', 'category', 'gross_value'),
+        db.Index('ix_expenses_company_day', 'company_id', 'local_day'),
+    )
     
     def __init__(self, transaction_type, description, gross_value, iva_rate, iva_value, net_value, user_id, company_id):
         self.transaction_type = transaction_type
@@ -84,16 +162,17 @@ class MonthlySummary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     month = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
-    total_sales = db.Column(db.Float, default=0.0)
-    total_sales_without_vat = db.Column(db.Float, default=0.0)
-    total_vat = db.Column(db.Float, default=0.0)
-    total_costs = db.Column(db.Float, default=0.0)
-    total_costs_without_vat = db.Column(db.Float, default=0.0)
-    profit = db.Column(db.Float, default=0.0)
-    profit_without_vat = db.Column(db.Float, default=0.0)
-    total_employee_salaries = db.Column(db.Float, default=0.0) 
-    total_employee_insurance = db.Column(db.Float, default=0.0) 
-    total_employer_social_security = db.Column(db.Float, default=0.0)
+    total_sales = db.Column(Money, default=0.0)
+    total_sales_without_vat = db.Column(Money, default=0.0)
+    total_vat = db.Column(Money, default=0.0)
+    total_costs = db.Column(Money, default=0.0)
+    total_costs_without_vat = db.Column(Money, default=0.0)
+    profit = db.Column(Money, default=0.0)
+    profit_without_vat = db.Column(Money, default=0.0)
+    total_employee_salaries = db.Column(Money, default=0.0) 
+    total_employee_insurance = db.Column(Money, default=0.0) 
+    total_employer_social_security = db.Column(Money, default=0.0)
+    version = db.Column(db.Integer, default=0)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     company = db.relationship('Company', backref=db.backref('monthly_summaries', lazy=True))
     create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -101,6 +180,7 @@ class MonthlySummary(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('month', 'year', 'company_id', name='_month_year_company_uc'),
+        db.Index('ix_monthly_summary_company_year_month', 'company_id', 'year', 'month'),
     )
     
     def __init__(self, month, year, company_id, total_sales=0.0, total_sales_without_vat=0.0, 
@@ -116,6 +196,91 @@ class MonthlySummary(db.Model):
         self.profit_without_vat = profit_without_vat
         self.total_costs_without_vat = total_costs_without_vat
 
+class QuarterlySummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    quarter = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    total_sales = db.Column(Money, default=0.0)
+    total_sales_without_vat = db.Column(Money, default=0.0)
+    total_vat = db.Column(Money, default=0.0)
+    total_costs = db.Column(Money, default=0.0)
+    total_costs_without_vat = db.Column(Money, default=0.0)
+    profit = db.Column(Money, default=0.0)
+    profit_without_vat = db.Column(Money, default=0.0)
+    total_employee_salaries = db.Column(Money, default=0.0)
+    total_employee_insurance = db.Column(Money, default=0.0)
+    total_employer_social_security = db.Column(Money, default=0.0)
+    version = db.Column(db.Integer, default=0)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company = db.relationship('Company', backref=db.backref('quarterly_summaries', lazy=True))
+    create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    
+    __table_args__ = (
+        db.UniqueConstraint('quarter', 'year', 'company_id', name='_quarter_year_company_uc'),
+        db.Index('ix_quarterly_summary_company_year_quarter', 'company_id', 'year', 'quarter'),
+    )
+    
+    def __init__(self, quarter, year, company_id):
+        self.quarter = quarter
+        self.year = year
+        self.company_id = company_id
+
+class YearlySummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    total_sales = db.Column(Money, default=0.0)
+    total_sales_without_vat = db.Column(Money, default=0.0)
+    total_vat = db.Column(Money, default=0.0)
+    total_costs = db.Column(Money, default=0.0)
+    total_costs_without_vat = db.Column(Money, default=0.0)
+    profit = db.Column(Money, default=0.0)
+    profit_without_vat = db.Column(Money, default=0.0)
+    total_employee_salaries = db.Column(Money, default=0.0)
+    total_employee_insurance = db.Column(Money, default=0.0)
+    total_employer_social_security = db.Column(Money, default=0.0)
+    version = db.Column(db.Integer, default=0)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company = db.relationship('Company', backref=db.backref('yearly_summaries', lazy=True))
+    create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    
+    __table_args__ = (
+        db.UniqueConstraint('year', 'company_id', name='_year_company_uc'),
+        db.Index('ix_yearly_summary_company_year', 'company_id', 'year'),
+    )
+    
+    def __init__(self, year, company_id):
+        self.year = year
+        self.company_id = company_id
+
+class DailySummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    total_sales = db.Column(Money, default=0.0)
+    total_sales_without_vat = db.Column(Money, default=0.0)
+    total_vat = db.Column(Money, default=0.0)
+    total_costs = db.Column(Money, default=0.0)
+    total_costs_without_vat = db.Column(Money, default=0.0)
+    profit = db.Column(Money, default=0.0)
+    profit_without_vat = db.Column(Money, default=0.0)
+    total_employee_salaries = db.Column(Money, default=0.0)
+    total_employee_insurance = db.Column(Money, default=0.0)
+    total_employer_social_security = db.Column(Money, default=0.0)
+    version = db.Column(db.Integer, default=0)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company = db.relationship('Company', backref=db.backref('daily_summaries', lazy=True))
+    create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'date', name='_company_date_uc'),
+    )
+    
+    def __init__(self, date, company_id):
+        self.date = date
+        self.company_id = company_id
+
 class Company(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, index=True)
@@ -148,16 +313,22 @@ class SimpleExpenses(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     transaction_type = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(255), nullable=False)
-    gross_value = db.Column(db.Float, nullable=False)
+    gross_value = db.Column(Money, nullable=False)
     iva_rate = db.Column(db.Float, nullable=False)
-    iva_value = db.Column(db.Float, nullable=False)
-    net_value = db.Column(db.Float, nullable=False)
+    iva_value = db.Column(Money, nullable=False)
+    net_value = db.Column(Money, nullable=False)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     company = db.relationship('Company', backref=db.backref('simple_expenses', lazy=True))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref=db.backref('simple_expenses', lazy=True))
     create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
     write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    period = db.Column(db.Integer)
+    local_day = db.Column(db.Date)
+    
+    __table_args__ = (
+        db.Index('ix_simple_expenses_company_period', 'company_id', 'period', 'create_date'),
+    )
     
     def __init__(self, transaction_type, description, gross_value, iva_rate, iva_value, net_value, user_id, company_id):
         self.transaction_type = transaction_type
@@ -169,19 +340,35 @@ class SimpleExpenses(db.Model):
         self.user_id = user_id
         self.company_id = company_id
 
+@event.listens_for(Expenses, 'before_insert')
+@event.listens_for(Expenses, 'before_update')
+@event.listens_for(SimpleExpenses, 'before_insert')
+@event.listens_for(SimpleExpenses, 'before_update')
+def set_ledger_period(mapper, connection, target):
+    # create_date is stored in UTC; the accounting period and day follow Lisbon local time
+    if target.create_date is None:
+        target.create_date = datetime.utcnow()
+    target.period = period_from_utc(target.create_date)
+    target.local_day = local_day_from_utc(target.create_date)
+
+@event.listens_for(Expenses, 'before_update')
+def set_expense_category(mapper, connection, target):
+    target.category = expense_category(target.description)
+
 class SimpleMonthlySummary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     month = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
-    total_sales = db.Column(db.Float, default=0.0)
-    total_sales_without_vat = db.Column(db.Float, default=0.0)
-    total_vat = db.Column(db.Float, default=0.0)
-    total_costs = db.Column(db.Float, default=0.0)
-    profit = db.Column(db.Float, default=0.0)
-    profit_without_vat = db.Column(db.Float, default=0.0)
-    total_employee_salaries = db.Column(db.Float, default=0.0) 
-    total_employee_insurance = db.Column(db.Float, default=0.0) 
-    total_employer_social_security = db.Column(db.Float, default=0.0)
+    total_sales = db.Column(Money, default=0.0)
+    total_sales_without_vat = db.Column(Money, default=0.0)
+    total_vat = db.Column(Money, default=0.0)
+    total_costs = db.Column(Money, default=0.0)
+    profit = db.Column(Money, default=0.0)
+    profit_without_vat = db.Column(Money, default=0.0)
+    total_employee_salaries = db.Column(Money, default=0.0) 
+    total_employee_insurance = db.Column(Money, default=0.0) 
+    total_employer_social_security = db.Column(Money, default=0.0)
+    version = db.Column(db.Integer, default=0)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     company = db.relationship('Company', backref=db.backref('simple_monthly_summaries', lazy=True))
     create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -210,6 +397,7 @@ class Settings(db.Model):
     employee_insurance_value = db.Column(db.Float, default=0.0, nullable=False)
     preferred_salary_expense_day = db.Column(db.Integer, default=1, nullable=False)
     other_expenses = db.Column(db.Float, default=0.0, nullable=False)
+    version = db.Column(db.Integer, default=0)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     company = db.relationship('Company', backref=db.backref('settings', lazy=True, uselist=False))
     create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -237,4 +425,37 @@ class Info(db.Model):
     
     def __init__(self, payment_vps_date=None, subscription_type_vps=None):
         self.payment_vps_date = payment_vps_date
-        self.subscription_type_vps = subscription_type_vps
\ No newline at end of file
+        self.subscription_type_vps = subscription_type_vps
+
+class BackgroundJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    payload = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    progress = db.Column(db.Float, default=0.0)
+    progress_message = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=1)
+    run_after = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'))
+    create_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    write_date = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    
+    __table_args__ = (
+        db.Index('ix_background_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_background_job_user_create_date', 'user_id', 'create_date'),
+    )
+    
+    def __init__(self, id, kind, payload=None, max_attempts=1, user_id=None, company_id=None):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.max_attempts = max_attempts
+        self.user_id = user_id
+        self.company_id = company_id
\ No newline at end of file
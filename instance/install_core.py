@@ -1,4 +1,6 @@
 from instance.seeds.users import create_users
+from instance.backfills import run_backfills
 
 def install_core():
     create_users()
+    run_backfills()
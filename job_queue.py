@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import logging
+import datetime
+import threading
+from sqlalchemy import update
+from extensions import db
+from instance.base import BackgroundJob
+from ledger_import import import_ledger
+from salary_automation import process_company_by_id
+from summary_rebuild import reconcile_summaries, SUMMARY_NAMES
+
+logger = logging.getLogger('job_queue')
+logger.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_JOB_WORKERS = 2
+JOB_POLL_SECONDS = 5
+RETRY_DELAY_SECONDS = 30
+STALE_JOB_MINUTES = 15
+STALE_CHECK_SECONDS = 60
+CLAIM_CANDIDATES = 5
+
+JOB_UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'job_uploads')
+
+job_handlers = {}
+wakeup = threading.Event()
+stop_event = threading.Event()
+workers = []
+last_stale_check = [0.0]
+
+def job_handler(kind, max_attempts=1):
+    def decorator(function):
+        job_handlers[kind] = (function, max_attempts)
+        return function
+    return decorator
+
+def enqueue_job(kind, payload=None, user_id=None, company_id=None):
+    _, max_attempts = job_handlers[kind]
+    job = BackgroundJob(uuid.uuid4().hex, kind, json.dumps(payload or {}), max_attempts, user_id, company_id)
+    db.session.add(job)
+    db.session.commit()
+    
+    wakeup.set()
+    logger.info(f"Tarefa {job.id} ({kind}) em fila")
+    return job.id
+
+def job_data(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'company_id': job.company_id,
+        'create_date': job.create_date.isoformat() if job.create_date else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def report_progress(job_id, fraction=None, message=None):
+    values = {'heartbeat_at': datetime.datetime.utcnow()}
+    if fraction is not None:
+        values['progress'] = min(max(fraction, 0.0), 1.0)
+    if message is not None:
+        values['progress_message'] = message[:255]
+    
+    # Progress goes through its own connection so it never commits the handler's open transaction
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(BackgroundJob.__table__.update().where(BackgroundJob.__table__.c.id == job_id).values(values))
+    except Exception as e:
+        logger.warning(f"Não foi possível atualizar o progresso da tarefa {job_id}: {str(e)}")
+
+def requeue_stale_jobs():
+    # A running job whose worker died stops sending heartbeats; it is retried or failed like any other error
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(minutes=STALE_JOB_MINUTES)
+    stale = (BackgroundJob.status == 'running') & (BackgroundJob.heartbeat_at < cutoff)
+    
+    requeued = db.session.execute(update(BackgroundJob).where(
+        stale, BackgroundJob.attempts < BackgroundJob.max_attempts
+    ).values(
+        status='queued', run_after=None, error='Tarefa interrompida; nova tentativa agendada'
+    ).execution_options(synchronize_session=False)).rowcount
+    failed = db.session.execute(update(BackgroundJob).where(stale).values(
+        status='failed', error='Tarefa interrompida', finished_at=datetime.datetime.utcnow()
+    ).execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    
+    if requeued or failed:
+        logger.warning(f"{requeued} tarefas interrompidas voltaram à fila e {failed} falharam")
+
+def claim_next_job():
+    now = datetime.datetime.utcnow()
+    candidates = db.session.query(BackgroundJob.id).filter(
+        BackgroundJob.status == 'queued',
+        (BackgroundJob.run_after.is_(None)) | (BackgroundJob.run_after <= now)
+    ).order_by(BackgroundJob.create_date).limit(CLAIM_CANDIDATES).all()
+    
+    # The status check in the update makes the claim atomic across workers and processes
+    for job_id, in candidates:
+        claimed = db.session.execute(update(BackgroundJob).where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.status == 'queued'
+        ).values(
+            status='running',
+            attempts=BackgroundJob.attempts + 1,
+            started_at=now,
+            heartbeat_at=now
+        ).execution_options(synchronize_session=False)).rowcount
+        db.session.commit()
+        
+        if claimed:
+            return db.session.get(BackgroundJob, job_id)
+    return None
+
+def run_job(job):
+    job_id, kind, attempts, max_attempts = job.id, job.kind, job.attempts, job.max_attempts
+    function = job_handlers.get(kind, (None, 0))[0]
+    
+    try:
+        if function is None:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+        
+        result = function(json.loads(job.payload or '{}'), lambda fraction=None, message=None: report_progress(job_id, fraction, message))
+        values = {
+            'status': 'succeeded',
+            'result': json.dumps(result, default=str),
+            'error': None,
+            'progress': 1.0,
+            'finished_at': datetime.datetime.utcnow()
+        }
+        logger.info(f"Tarefa {job_id} ({kind}) concluída")
+    except Exception as e:
+        db.session.rollback()
+        
+        if function is not None and attempts < max_attempts:
+            delay = RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+            values = {'status': 'queued', 'error': str(e), 'run_after': datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)}
+            logger.warning(f"Tarefa {job_id} ({kind}) falhou na tentativa {attempts}/{max_attempts}; nova tentativa em {delay}s: {str(e)}")
+        else:
+            values = {'status': 'failed', 'error': str(e), 'finished_at': datetime.datetime.utcnow()}
+            logger.error(f"Tarefa {job_id} ({kind}) falhou: {str(e)}")
+    
+    db.session.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(values).execution_options(synchronize_session=False))
+    db.session.commit()
+
+def worker_loop(app):
+    while not stop_event.is_set():
+        job = None
+        
+        with app.app_context():
+            try:
+                job = claim_next_job()
+                if job:
+                    run_job(job)
+                elif time.monotonic() - last_stale_check[0] >= STALE_CHECK_SECONDS:
+                    last_stale_check[0] = time.monotonic()
+                    requeue_stale_jobs()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro no processamento de tarefas: {str(e)}")
+            finally:
+                db.session.remove()
+        
+        if not job:
+            wakeup.wait(JOB_POLL_SECONDS)
+            wakeup.clear()
+
+def start_job_workers(app, count=None):
+    if workers:
+        return workers
+    
+    count = count or int(os.environ.get('JOB_WORKERS', DEFAULT_JOB_WORKERS))
+    os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+    
+    stop_event.clear()
+    for index in range(count):
+        worker = threading.Thread(target=worker_loop, args=(app,), name=f"job-worker-{index + 1}", daemon=True)
+        worker.start()
+        workers.append(worker)
+    
+    logger.info(f"{count} trabalhadores de tarefas em segundo plano iniciados.")
+    return workers
+
+def stop_job_workers(timeout=None):
+    stop_event.set()
+    wakeup.set()
+    for worker in workers:
+        worker.join(timeout)
+    workers.clear()
+
+def save_job_upload(file):
+    os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+    path = os.path.join(JOB_UPLOAD_FOLDER, uuid.uuid4().hex)
+    file.save(path)
+    return path
+
+@job_handler('import_ledger')
+def import_ledger_job(payload, progress):
+    # Batches commit as they go, so a failed import is not retried on top of the rows already imported
+    try:
+        with open(payload['path'], 'rb') as file:
+            return import_ledger(
+                file, payload['filename'], payload['company_id'], payload['user_id'], payload.get('simple', False),
+                progress=lambda imported: progress(message=f"{imported} transações importadas")
+            )
+    finally:
+        if os.path.exists(payload['path']):
+            os.remove(payload['path'])
+
+@job_handler('reconcile_summaries', max_attempts=3)
+def reconcile_summaries_job(payload, progress):
+    names = payload.get('only') or SUMMARY_NAMES
+    report = {}
+    
+    for index, name in enumerate(names):
+        progress(index / len(names), f"A verificar resumos {name}")
+        report.update(reconcile_summaries(repair=payload.get('repair', False), company_id=payload.get('company_id'), only=[name]))
+    
+    return report
+
+@job_handler('process_company_expenses', max_attempts=3)
+def process_company_expenses_job(payload, progress):
+    # The run date travels with the job, so a retry posts to the same month
+    report = process_company_by_id(payload['company_id'], datetime.datetime.fromisoformat(payload['date']))
+    if report and 'error' in report:
+        raise RuntimeError(report['error'])
+    return report
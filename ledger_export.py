@@ -0,0 +1,85 @@
+import io
+import csv
+import datetime
+import tempfile
+from openpyxl import Workbook
+from instance.base import Expenses, LOCAL_TIMEZONE, period_from_utc
+from extensions import db
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_HEADER = ['id', 'create_date', 'transaction_type', 'description', 'gross_value', 'iva_rate', 'iva_value', 'net_value']
+
+def local_day_start_utc(day):
+    local_start = LOCAL_TIMEZONE.localize(datetime.datetime.combine(day, datetime.time.min))
+    return local_start.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def export_query(company_id, start_date, end_date, transaction_type=None):
+    start = local_day_start_utc(start_date)
+    end = local_day_start_utc(end_date + datetime.timedelta(days=1))
+    
+    query = db.session.query(
+        Expenses.id,
+        Expenses.create_date,
+        Expenses.transaction_type,
+        Expenses.description,
+        Expenses.gross_value,
+        Expenses.iva_rate,
+        Expenses.iva_value,
+        Expenses.net_value
+    ).filter(
+        Expenses.company_id == company_id,
+        Expenses.period.between(period_from_utc(start), period_from_utc(end)),
+        Expenses.create_date >= start,
+        Expenses.create_date < end
+    )
+    
+    if transaction_type:
+        query = query.filter(Expenses.transaction_type == transaction_type)
+    
+    return query.order_by(Expenses.create_date, Expenses.id).execution_options(
+        stream_results=True
+    ).yield_per(EXPORT_CHUNK_SIZE)
+
+def export_row(row):
+    local_date = LOCAL_TIMEZONE.fromutc(row.create_date) if row.create_date else None
+    return [
+        row.id,
+        local_date.strftime('%Y-%m-%d %H:%M:%S') if local_date else '',
+        row.transaction_type,
+        row.description,
+        row.gross_value,
+        row.iva_rate,
+        row.iva_value,
+        row.net_value
+    ]
+
+def iter_csv(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADER)
+    
+    for count, row in enumerate(query, start=1):
+        writer.writerow(export_row(row))
+        
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def write_xlsx(query):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Transações')
+    sheet.append(EXPORT_HEADER)
+    
+    for row in query:
+        sheet.append(export_row(row))
+    
+    # The file is unlinked once closed, so a large export never stays on disk
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
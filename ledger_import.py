@@ -0,0 +1,195 @@
+import io
+import os
+import logging
+import argparse
+import datetime
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from instance.base import Expenses, SimpleExpenses, LOCAL_TIMEZONE, period_from_utc, local_day_from_utc
+from ledger_service import summary_delta, delta_key, merge_delta, apply_summary_deltas
+from extensions import db
+
+logger = logging.getLogger('ledger_import')
+logger.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+IMPORT_COLUMNS = ['transaction_type', 'description', 'gross_value', 'iva_rate', 'iva_value', 'net_value', 'create_date']
+REQUIRED_COLUMNS = ['transaction_type', 'description', 'gross_value', 'iva_rate']
+TRANSACTION_TYPES = ['ganho', 'despesa']
+
+def read_csv_batches(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    for frame in pd.read_csv(text, dtype=str, sep=None, engine='python', chunksize=IMPORT_BATCH_SIZE, skipinitialspace=True):
+        yield frame
+
+def read_xlsx_batches(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value) if value is not None else '' for value in next(rows, ())]
+        
+        batch = []
+        for row in rows:
+            batch.append((tuple(row) + (None,) * len(header))[:len(header)])
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                yield pd.DataFrame(batch, columns=header, dtype=object)
+                batch = []
+        
+        if batch:
+            yield pd.DataFrame(batch, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+def read_batches(file, filename):
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return read_xlsx_batches(file)
+    return read_csv_batches(file)
+
+def parse_amounts(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return pd.to_numeric(column, errors='coerce')
+    
+    text = column.astype(str).str.strip().str.replace('€', '', regex=False).str.replace(' ', '', regex=False)
+    
+    # The separator that appears last marks the decimals; the other one, or a repeated one, only groups thousands
+    comma_last = text.str.rfind(',') > text.str.rfind('.')
+    decimal_comma = comma_last & (text.str.count(',') == 1)
+    decimal_dot = ~comma_last & (text.str.count(r'\.') == 1)
+    
+    without_commas = text.str.replace(',', '', regex=False)
+    without_dots = text.str.replace('.', '', regex=False)
+    text = without_commas.str.replace('.', '', regex=False)
+    text = text.mask(decimal_comma, without_dots.str.replace(',', '.', regex=False))
+    text = text.mask(decimal_dot, without_commas)
+    return pd.to_numeric(text, errors='coerce')
+
+def parse_dates(column):
+    iso = column.astype(str).str.match(r'^\d{4}-\d{2}-\d{2}')
+    dates = pd.to_datetime(column.where(iso), errors='coerce', format='mixed')
+    dates = dates.fillna(pd.to_datetime(column.where(~iso), errors='coerce', dayfirst=True, format='mixed'))
+    # Dates in bank exports are Lisbon local time; create_date is stored in UTC
+    return dates.dt.tz_localize(LOCAL_TIMEZONE, ambiguous='NaT', nonexistent='shift_forward').dt.tz_convert('UTC').dt.tz_localize(None)
+
+def validate_batch(frame, first_row):
+    frame = frame.rename(columns=lambda name: str(name).strip().lower())
+    
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Colunas em falta: {', '.join(missing)}")
+    
+    for column in IMPORT_COLUMNS:
+        if column not in frame.columns:
+            frame[column] = None
+    
+    transaction_type = frame['transaction_type'].fillna('').astype(str).str.strip().str.lower()
+    description = frame['description'].fillna('').astype(str).str.strip()
+    gross_value = parse_amounts(frame['gross_value'])
+    iva_rate = parse_amounts(frame['iva_rate'])
+    
+    net_value = parse_amounts(frame['net_value'])
+    net_value = net_value.where(net_value.notna(), (gross_value / (1 + iva_rate / 100)).round(2))
+    iva_value = parse_amounts(frame['iva_value'])
+    iva_value = iva_value.where(iva_value.notna(), (gross_value - net_value).round(2))
+    
+    now = datetime.datetime.utcnow()
+    has_date = frame['create_date'].notna() & (frame['create_date'].astype(str).str.strip() != '')
+    create_date = parse_dates(frame['create_date'].where(has_date))
+    
+    checks = [
+        (~transaction_type.isin(TRANSACTION_TYPES), 'Tipo de transação inválido (use ganho ou despesa)'),
+        (description == '', 'Descrição em falta'),
+        (description.str.len() > 255, 'Descrição demasiado longa'),
+        (gross_value.isna() | (gross_value < 0), 'Valor bruto inválido'),
+        (iva_rate.isna() | (iva_rate < 0), 'Taxa de IVA inválida'),
+        (net_value.isna() | iva_value.isna(), 'Valores de IVA ou líquido inválidos'),
+        (has_date & create_date.isna(), 'Data inválida'),
+    ]
+    
+    invalid = pd.Series(False, index=frame.index)
+    errors = []
+    for mask, message in checks:
+        for position in mask[mask & ~invalid].index:
+            errors.append({'row': first_row + frame.index.get_loc(position), 'message': message})
+        invalid |= mask
+    
+    valid = ~invalid
+    rows = [
+        {
+            'transaction_type': row_type,
+            'description': row_description,
+            'gross_value': float(row_gross),
+            'iva_rate': float(row_rate),
+            'iva_value': float(row_iva),
+            'net_value': float(row_net),
+            'create_date': now if pd.isna(row_date) else row_date.to_pydatetime(),
+        }
+        for row_type, row_description, row_gross, row_rate, row_iva, row_net, row_date in zip(
+            transaction_type[valid], description[valid], gross_value[valid], iva_rate[valid],
+            iva_value[valid], net_value[valid], create_date[valid]
+        )
+    ]
+    
+    errors.sort(key=lambda error: error['row'])
+    return rows, errors
+
+def import_ledger(file, filename, company_id, user_id, simple=False, progress=None):
+    model = SimpleExpenses if simple else Expenses
+    result = {'imported': 0, 'error_count': 0, 'errors': []}
+    
+    first_row = 2
+    for frame in read_batches(file, filename):
+        rows, errors = validate_batch(frame, first_row)
+        
+        if rows:
+            for row in rows:
+                row['company_id'] = company_id
+                row['user_id'] = user_id
+                row['period'] = period_from_utc(row['create_date'])
+                row['local_day'] = local_day_from_utc(row['create_date'])
+            
+            try:
+                deltas = {}
+                for row in rows:
+                    merge_delta(deltas, delta_key(company_id, row['create_date']), summary_delta(row, simple))
+                
+                db.session.execute(insert(model), rows)
+                apply_summary_deltas(model, deltas)
+                db.session.commit()
+                result['imported'] += len(rows)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao importar lote a partir da linha {first_row}: {str(e)}")
+                errors = [{'row': first_row, 'message': f'Lote de {len(frame)} linhas não importado: {str(e)}'}] + errors
+        
+        result['error_count'] += len(errors)
+        result['errors'].extend(errors[:MAX_REPORTED_ERRORS - len(result['errors'])])
+        first_row += len(frame)
+        
+        if progress:
+            progress(result['imported'])
+    
+    logger.info(f"Importadas {result['imported']} transações para a empresa {company_id} ({result['error_count']} erros)")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importar transações de um ficheiro CSV ou XLSX.")
+    parser.add_argument('file')
+    parser.add_argument('--company-id', type=int, required=True)
+    parser.add_argument('--user-id', type=int, required=True)
+    parser.add_argument('--simple', action='store_true', help="Importar para as vendas simples")
+    args = parser.parse_args()
+    
+    from app import app
+    
+    with app.app_context(), open(args.file, 'rb') as file:
+        result = import_ledger(file, os.path.basename(args.file), args.company_id, args.user_id, args.simple)
+    
+    print(f"Importadas: {result['imported']}")
+    for error in result['errors']:
+        print(f"Linha {error['row']}: {error['message']}")
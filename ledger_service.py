@@ -0,0 +1,170 @@
+from sqlalchemy import func, literal, type_coerce, BigInteger
+from sqlalchemy.dialects import sqlite, postgresql
+from instance.base import (
+    Expenses, SimpleExpenses, MonthlySummary, QuarterlySummary, YearlySummary, DailySummary, SimpleMonthlySummary,
+    local_day_from_utc, quarter_of, to_cents
+)
+from extensions import db
+
+# Daily, quarterly and yearly rollups take the same deltas as the monthly summary of the ledger
+SUMMARY_MODELS = {
+    Expenses: [MonthlySummary, QuarterlySummary, YearlySummary, DailySummary],
+    SimpleExpenses: [SimpleMonthlySummary]
+}
+
+UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def entry_snapshot(entry):
+    return {
+        'company_id': entry.company_id,
+        'create_date': entry.create_date,
+        'period': entry.period,
+        'transaction_type': entry.transaction_type,
+        'description': entry.description,
+        'gross_value': entry.gross_value,
+        'net_value': entry.net_value,
+        'iva_value': entry.iva_value
+    }
+
+# Deltas are integer cents, so merged and applied totals stay exact
+def summary_delta(snapshot, simple, sign=1):
+    transaction_type = (snapshot['transaction_type'] or '').lower()
+    gross_value = sign * to_cents(snapshot['gross_value'])
+    net_value = sign * to_cents(snapshot['net_value'])
+    iva_value = sign * to_cents(snapshot['iva_value'])
+    
+    if transaction_type == 'ganho':
+        return {
+            'total_sales': gross_value,
+            'total_sales_without_vat': net_value,
+            'total_vat': iva_value
+        }
+    
+    if transaction_type != 'despesa':
+        return {}
+    
+    if simple:
+        return {'total_costs': gross_value}
+    
+    delta = {
+        'total_costs': gross_value,
+        'total_costs_without_vat': net_value,
+        'total_vat': -iva_value
+    }
+    
+    description = snapshot['description'] or ''
+    if description.startswith('Salário:'):
+        delta['total_employee_salaries'] = gross_value
+    elif description == 'Seguros dos Empregados':
+        delta['total_employee_insurance'] = gross_value
+    
+    return delta
+
+# Deltas are keyed by company and local day; each summary derives its own key from the day
+def delta_key(company_id, create_date):
+    return company_id, local_day_from_utc(create_date)
+
+def merge_delta(deltas, key, delta):
+    total = deltas.setdefault(key, {})
+    for column, value in delta.items():
+        total[column] = total.get(column, 0) + value
+
+def add_profit(delta, simple):
+    costs_without_vat = delta.get('total_costs', 0) if simple else delta.get('total_costs_without_vat', 0)
+    delta['profit'] = delta.get('total_sales', 0) - delta.get('total_costs', 0)
+    delta['profit_without_vat'] = delta.get('total_sales_without_vat', 0) - costs_without_vat
+    return delta
+
+SUMMARY_KEYS = {
+    MonthlySummary: ('year', 'month'),
+    QuarterlySummary: ('year', 'quarter'),
+    YearlySummary: ('year',),
+    DailySummary: ('date',),
+    SimpleMonthlySummary: ('year', 'month')
+}
+
+def summary_key(summary_model, day):
+    values = {'year': day.year, 'quarter': quarter_of(day.month), 'month': day.month, 'date': day}
+    return {column: values[column] for column in SUMMARY_KEYS[summary_model]}
+
+def apply_summary_delta(summary_model, company_id, key, delta):
+    delta = {column: value for column, value in delta.items() if value}
+    
+    if delta:
+        add_profit(delta, summary_model is SimpleMonthlySummary)
+    
+    table = summary_model.__table__
+    # Bind the cents as plain integers; the Money type would scale them a second time
+    delta = {column: literal(value, BigInteger) for column, value in delta.items()}
+    increments = {
+        column: func.coalesce(type_coerce(table.c[column], BigInteger), 0) + value
+        for column, value in delta.items()
+    }
+    # Every write bumps the version, even one that leaves the totals unchanged, so cached responses expire
+    increments['version'] = func.coalesce(table.c.version, 0) + 1
+    increments['write_date'] = func.current_timestamp()
+    
+    upsert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    
+    if upsert:
+        statement = upsert(table).values(company_id=company_id, version=1, **key, **delta)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[*key, 'company_id'],
+            set_=increments
+        ))
+        return
+    
+    result = db.session.execute(table.update().where(
+        table.c.company_id == company_id,
+        *[table.c[column] == value for column, value in key.items()]
+    ).values(increments))
+    
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(company_id=company_id, version=1, **key, **delta))
+
+def apply_summary_deltas(model, deltas):
+    for summary_model in SUMMARY_MODELS[model]:
+        # Days falling in the same month, quarter or year are merged first, so each summary row is written once
+        rolled = {}
+        for (company_id, day), delta in deltas.items():
+            key = tuple(summary_key(summary_model, day).items())
+            merge_delta(rolled, (company_id, key), delta)
+        
+        for (company_id, key), delta in rolled.items():
+            apply_summary_delta(summary_model, company_id, dict(key), delta)
+
+def add_ledger_entry(entry):
+    db.session.add(entry)
+    db.session.flush()
+    
+    snapshot = entry_snapshot(entry)
+    deltas = {}
+    merge_delta(deltas, delta_key(snapshot['company_id'], snapshot['create_date']), summary_delta(snapshot, type(entry) is SimpleExpenses))
+    apply_summary_deltas(type(entry), deltas)
+    return entry
+
+def delete_ledger_entry(entry):
+    snapshot = entry_snapshot(entry)
+    db.session.delete(entry)
+    
+    deltas = {}
+    merge_delta(deltas, delta_key(snapshot['company_id'], snapshot['create_date']), summary_delta(snapshot, type(entry) is SimpleExpenses, -1))
+    apply_summary_deltas(type(entry), deltas)
+
+def update_ledger_entry(entry, **values):
+    simple = type(entry) is SimpleExpenses
+    old = entry_snapshot(entry)
+    
+    for column, value in values.items():
+        setattr(entry, column, value)
+    db.session.flush()
+    
+    new = entry_snapshot(entry)
+    deltas = {}
+    merge_delta(deltas, delta_key(old['company_id'], old['create_date']), summary_delta(old, simple, -1))
+    merge_delta(deltas, delta_key(new['company_id'], new['create_date']), summary_delta(new, simple))
+    apply_summary_deltas(type(entry), deltas)
+    return entry
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from instance.base import Money
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -45,6 +47,19 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+def render_item(type_, obj, autogen_context):
+    # Money stores integer cents; render the plain column type so revisions do not import the models
+    if type_ == 'type' and isinstance(obj, Money):
+        return 'sa.BigInteger()'
+    return False
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The scheduler's job store shares the database but is not part of the models
+    table_name = name if type_ == 'table' else getattr(getattr(object, 'table', None), 'name', '')
+    return not table_name.startswith('apscheduler_')
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +80,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        render_item=render_item, include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +109,10 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("render_item") is None:
+        conf_args["render_item"] = render_item
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,174 @@
+"""ledger accounting period
+
+Revision ID: 3c4f50f52fb9
+Revises: 7bf72903651e
+Create Date: 2026-10-18 11:40:12.318204
+
+"""
+import datetime
+from alembic import op
+import sqlalchemy as sa
+from instance.base import period_from_utc
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4f50f52fb9'
+down_revision = '7bf72903651e'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_periods(table_name):
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('create_date', sa.DateTime),
+        sa.column('period', sa.Integer)
+    )
+    statement = table.update().where(table.c.id == sa.bindparam('row_id')).values(period=sa.bindparam('row_period'))
+    connection = op.get_bind()
+    
+    last_id = 0
+    while True:
+        rows = connection.execute(sa.select(table.c.id, table.c.create_date).where(
+            table.c.id > last_id,
+            table.c.create_date.isnot(None)
+        ).order_by(table.c.id).limit(BACKFILL_BATCH_SIZE)).all()
+        
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        connection.execute(statement, [
+            {'row_id': row.id, 'row_period': period_from_utc(row.create_date)}
+            for row in rows
+        ])
+
+
+MONTHLY_FIELDS = [
+    'total_sales', 'total_sales_without_vat', 'total_vat', 'total_costs', 'total_costs_without_vat',
+    'profit', 'profit_without_vat', 'total_employee_salaries', 'total_employee_insurance'
+]
+SIMPLE_FIELDS = ['total_sales', 'total_sales_without_vat', 'total_vat', 'total_costs', 'profit', 'profit_without_vat']
+# Amount columns the ledger does not feed; new summary rows start them at zero like the model defaults
+UNFED_COLUMNS = {
+    'monthly_summary': ['total_employer_social_security'],
+    'simple_monthly_summary': ['total_employee_salaries', 'total_employee_insurance', 'total_employer_social_security']
+}
+
+
+def period_totals(table_name, simple):
+    ledger = sa.table(
+        table_name,
+        sa.column('company_id', sa.Integer),
+        sa.column('period', sa.Integer),
+        sa.column('transaction_type', sa.String),
+        sa.column('description', sa.String),
+        sa.column('gross_value', sa.Float),
+        sa.column('net_value', sa.Float),
+        sa.column('iva_value', sa.Float)
+    )
+    is_gain = sa.func.lower(ledger.c.transaction_type) == 'ganho'
+    is_cost = sa.func.lower(ledger.c.transaction_type) == 'despesa'
+    
+    def total(condition, column):
+        return sa.func.coalesce(sa.func.sum(sa.case((condition, column), else_=0)), 0)
+    
+    rows = op.get_bind().execute(sa.select(
+        ledger.c.company_id,
+        ledger.c.period,
+        total(is_gain, ledger.c.gross_value).label('sales'),
+        total(is_gain, ledger.c.net_value).label('sales_without_vat'),
+        total(is_gain, ledger.c.iva_value).label('vat_collected'),
+        total(is_cost, ledger.c.iva_value).label('vat_paid'),
+        total(is_cost, ledger.c.gross_value).label('costs'),
+        total(is_cost, ledger.c.net_value).label('costs_without_vat'),
+        total(is_cost & ledger.c.description.like('Salário:%'), ledger.c.gross_value).label('salaries'),
+        total(is_cost & (ledger.c.description == 'Seguros dos Empregados'), ledger.c.gross_value).label('insurance')
+    ).where(ledger.c.period.isnot(None)).group_by(ledger.c.company_id, ledger.c.period))
+    
+    totals = {}
+    for row in rows:
+        if simple:
+            values = {
+                'total_sales': row.sales,
+                'total_sales_without_vat': row.sales_without_vat,
+                'total_vat': row.vat_collected,
+                'total_costs': row.costs,
+                'profit': row.sales - row.costs,
+                'profit_without_vat': row.sales_without_vat - row.costs
+            }
+        else:
+            values = {
+                'total_sales': row.sales,
+                'total_sales_without_vat': row.sales_without_vat,
+                'total_vat': row.vat_collected - row.vat_paid,
+                'total_costs': row.costs,
+                'total_costs_without_vat': row.costs_without_vat,
+                'profit': row.sales - row.costs,
+                'profit_without_vat': row.sales_without_vat - row.costs_without_vat,
+                'total_employee_salaries': row.salaries,
+                'total_employee_insurance': row.insurance
+            }
+        totals[(row.company_id, *divmod(row.period, 100))] = {field: round(value, 2) for field, value in values.items()}
+    return totals
+
+
+def rebuild_summaries(summary_name, fields, totals):
+    summary = sa.table(
+        summary_name,
+        sa.column('id', sa.Integer),
+        sa.column('company_id', sa.Integer),
+        sa.column('year', sa.Integer),
+        sa.column('month', sa.Integer),
+        sa.column('create_date', sa.DateTime),
+        sa.column('write_date', sa.DateTime),
+        *[sa.column(column, sa.Float) for column in fields + UNFED_COLUMNS[summary_name]]
+    )
+    connection = op.get_bind()
+    stored = {
+        (row.company_id, row.year, row.month): row.id
+        for row in connection.execute(sa.select(summary.c.id, summary.c.company_id, summary.c.year, summary.c.month))
+    }
+    
+    now = datetime.datetime.utcnow()
+    zero = dict.fromkeys(fields, 0.0)
+    updates = [
+        {'row_id': row_id, 'row_write_date': now, **{f'row_{field}': value for field, value in totals.get(key, zero).items()}}
+        for key, row_id in stored.items()
+    ]
+    inserts = [
+        {**dict.fromkeys(UNFED_COLUMNS[summary_name], 0.0), **values, 'company_id': key[0], 'year': key[1], 'month': key[2],
+         'create_date': now, 'write_date': now}
+        for key, values in totals.items() if key not in stored
+    ]
+    
+    if updates:
+        connection.execute(summary.update().where(summary.c.id == sa.bindparam('row_id')).values(
+            write_date=sa.bindparam('row_write_date'),
+            **{field: sa.bindparam(f'row_{field}') for field in fields}
+        ), updates)
+    if inserts:
+        connection.execute(summary.insert(), inserts)
+
+
+def upgrade():
+    for table_name in ('expenses', 'simple_expenses'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+            batch_op.create_index(f'ix_{table_name}_company_period', ['company_id', 'period', 'create_date'], unique=False)
+        
+        backfill_periods(table_name)
+    
+    # Stored summaries were built from UTC months; rebuilding them by period keeps them on the same local months as the ledger
+    rebuild_summaries('monthly_summary', MONTHLY_FIELDS, period_totals('expenses', False))
+    rebuild_summaries('simple_monthly_summary', SIMPLE_FIELDS, period_totals('simple_expenses', True))
+
+
+def downgrade():
+    for table_name in ('simple_expenses', 'expenses'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table_name}_company_period')
+            batch_op.drop_column('period')
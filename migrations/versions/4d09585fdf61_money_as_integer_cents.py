@@ -0,0 +1,63 @@
+"""money as integer cents
+
+Revision ID: 4d09585fdf61
+Revises: c667118640f4
+Create Date: 2026-10-18 11:58:27.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d09585fdf61'
+down_revision = 'c667118640f4'
+branch_labels = None
+depends_on = None
+
+LEDGER_AMOUNTS = ['gross_value', 'iva_value', 'net_value']
+SUMMARY_AMOUNTS = [
+    'total_sales', 'total_sales_without_vat', 'total_vat', 'total_costs', 'profit', 'profit_without_vat',
+    'total_employee_salaries', 'total_employee_insurance', 'total_employer_social_security'
+]
+MONEY_COLUMNS = {
+    'expenses': LEDGER_AMOUNTS,
+    'simple_expenses': LEDGER_AMOUNTS,
+    'monthly_summary': SUMMARY_AMOUNTS + ['total_costs_without_vat'],
+    'simple_monthly_summary': SUMMARY_AMOUNTS
+}
+
+
+def reflected_columns(table_name, column_type):
+    inspector = sa.inspect(op.get_bind())
+    reflected = {column['name']: column['type'] for column in inspector.get_columns(table_name)}
+    return [name for name in MONEY_COLUMNS[table_name] if isinstance(reflected[name], column_type)]
+
+
+def upgrade():
+    # Databases already converted by the former startup step are left alone, so amounts are never scaled twice
+    for table_name in MONEY_COLUMNS:
+        pending = reflected_columns(table_name, sa.Float)
+        if not pending:
+            continue
+        
+        table = sa.table(table_name, *[sa.column(name, sa.Float) for name in pending])
+        op.execute(table.update().values({table.c[name]: sa.func.round(table.c[name] * 100) for name in pending}))
+        
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name in pending:
+                batch_op.alter_column(name, existing_type=sa.Float(), type_=sa.BigInteger())
+
+
+def downgrade():
+    for table_name in MONEY_COLUMNS:
+        pending = reflected_columns(table_name, sa.BigInteger)
+        if not pending:
+            continue
+        
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name in pending:
+                batch_op.alter_column(name, existing_type=sa.BigInteger(), type_=sa.Float())
+        
+        table = sa.table(table_name, *[sa.column(name, sa.Float) for name in pending])
+        op.execute(table.update().values({table.c[name]: table.c[name] / 100.0 for name in pending}))
@@ -0,0 +1,44 @@
+"""daily summaries
+
+Revision ID: 51ec691948dd
+Revises: f86db2cba12b
+Create Date: 2026-10-18 12:09:31.887460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '51ec691948dd'
+down_revision = 'f86db2cba12b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('total_sales', sa.BigInteger(), nullable=True),
+    sa.Column('total_sales_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('profit', sa.BigInteger(), nullable=True),
+    sa.Column('profit_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_salaries', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_insurance', sa.BigInteger(), nullable=True),
+    sa.Column('total_employer_social_security', sa.BigInteger(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('create_date', sa.DateTime(), nullable=True),
+    sa.Column('write_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'date', name='_company_date_uc')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_summary')
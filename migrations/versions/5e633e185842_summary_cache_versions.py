@@ -0,0 +1,33 @@
+"""summary cache versions
+
+Revision ID: 5e633e185842
+Revises: 4d09585fdf61
+Create Date: 2026-10-18 12:01:49.670214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e633e185842'
+down_revision = '4d09585fdf61'
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['monthly_summary', 'simple_monthly_summary', 'settings']
+
+
+def upgrade():
+    for table_name in VERSIONED_TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=True))
+        
+        table = sa.table(table_name, sa.column('version', sa.Integer))
+        op.execute(table.update().values(version=0))
+
+
+def downgrade():
+    for table_name in reversed(VERSIONED_TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('version')
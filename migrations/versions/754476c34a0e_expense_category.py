@@ -0,0 +1,29 @@
+"""expense category
+
+Revision ID: 754476c34a0e
+Revises: 5e633e185842
+Create Date: 2026-10-18 12:04:16.028853
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '754476c34a0e'
+down_revision = '5e633e185842'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get their category from backfill_expense_categories at startup
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('category', sa.String(length=50), nullable=True))
+        batch_op.create_index('ix_expenses_category', ['company_id', 'period', 'transaction_type', 'category', 'gross_value'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_expenses_category')
+        batch_op.drop_column('category')
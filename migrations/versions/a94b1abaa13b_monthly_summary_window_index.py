@@ -0,0 +1,26 @@
+"""monthly summary window index
+
+Revision ID: a94b1abaa13b
+Revises: 3c4f50f52fb9
+Create Date: 2026-10-18 11:52:40.206377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a94b1abaa13b'
+down_revision = '3c4f50f52fb9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('monthly_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_monthly_summary_company_year_month', ['company_id', 'year', 'month'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('monthly_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_monthly_summary_company_year_month')
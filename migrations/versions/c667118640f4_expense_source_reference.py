@@ -0,0 +1,33 @@
+"""expense source reference
+
+Revision ID: c667118640f4
+Revises: a94b1abaa13b
+Create Date: 2026-10-18 11:55:03.914528
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c667118640f4'
+down_revision = 'a94b1abaa13b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing automated rows are tagged from their descriptions by backfill_expense_sources at startup
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source_kind', sa.String(length=30), nullable=True))
+        batch_op.add_column(sa.Column('source_period', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('source_ref', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_expenses_source', ['company_id', 'source_kind', 'source_period', 'source_ref'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_expenses_source')
+        batch_op.drop_column('source_ref')
+        batch_op.drop_column('source_period')
+        batch_op.drop_column('source_kind')
@@ -0,0 +1,67 @@
+"""ledger local day
+
+Revision ID: cc56aa716fe3
+Revises: 4b9a6cbe9c39
+Create Date: 2026-10-18 14:02:47.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from instance.base import local_day_from_utc
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc56aa716fe3'
+down_revision = '4b9a6cbe9c39'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_local_days(table_name):
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('create_date', sa.DateTime),
+        sa.column('local_day', sa.Date)
+    )
+    statement = table.update().where(table.c.id == sa.bindparam('row_id')).values(local_day=sa.bindparam('row_day'))
+    connection = op.get_bind()
+    
+    last_id = 0
+    while True:
+        rows = connection.execute(sa.select(table.c.id, table.c.create_date).where(
+            table.c.id > last_id,
+            table.c.create_date.isnot(None)
+        ).order_by(table.c.id).limit(BACKFILL_BATCH_SIZE)).all()
+        
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        connection.execute(statement, [
+            {'row_id': row.id, 'row_day': local_day_from_utc(row.create_date)}
+            for row in rows
+        ])
+
+
+def upgrade():
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('local_day', sa.Date(), nullable=True))
+        batch_op.create_index('ix_expenses_company_day', ['company_id', 'local_day'], unique=False)
+    
+    with op.batch_alter_table('simple_expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('local_day', sa.Date(), nullable=True))
+    
+    for table_name in ('expenses', 'simple_expenses'):
+        backfill_local_days(table_name)
+
+
+def downgrade():
+    with op.batch_alter_table('simple_expenses', schema=None) as batch_op:
+        batch_op.drop_column('local_day')
+    
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_expenses_company_day')
+        batch_op.drop_column('local_day')
@@ -0,0 +1,78 @@
+"""quarterly and yearly summaries
+
+Revision ID: f86db2cba12b
+Revises: 754476c34a0e
+Create Date: 2026-10-18 12:07:55.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f86db2cba12b'
+down_revision = '754476c34a0e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quarterly_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quarter', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_sales', sa.BigInteger(), nullable=True),
+    sa.Column('total_sales_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('profit', sa.BigInteger(), nullable=True),
+    sa.Column('profit_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_salaries', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_insurance', sa.BigInteger(), nullable=True),
+    sa.Column('total_employer_social_security', sa.BigInteger(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('create_date', sa.DateTime(), nullable=True),
+    sa.Column('write_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('quarter', 'year', 'company_id', name='_quarter_year_company_uc')
+    )
+    with op.batch_alter_table('quarterly_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_quarterly_summary_company_year_quarter', ['company_id', 'year', 'quarter'], unique=False)
+
+    op.create_table('yearly_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_sales', sa.BigInteger(), nullable=True),
+    sa.Column('total_sales_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs', sa.BigInteger(), nullable=True),
+    sa.Column('total_costs_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('profit', sa.BigInteger(), nullable=True),
+    sa.Column('profit_without_vat', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_salaries', sa.BigInteger(), nullable=True),
+    sa.Column('total_employee_insurance', sa.BigInteger(), nullable=True),
+    sa.Column('total_employer_social_security', sa.BigInteger(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('create_date', sa.DateTime(), nullable=True),
+    sa.Column('write_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('year', 'company_id', name='_year_company_uc')
+    )
+    with op.batch_alter_table('yearly_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_yearly_summary_company_year', ['company_id', 'year'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('yearly_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_yearly_summary_company_year')
+
+    op.drop_table('yearly_summary')
+    with op.batch_alter_table('quarterly_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_quarterly_summary_company_year_quarter')
+
+    op.drop_table('quarterly_summary')
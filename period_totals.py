@@ -0,0 +1,113 @@
+import datetime
+import calendar
+from types import SimpleNamespace
+from sqlalchemy import func, or_, type_coerce, BigInteger
+from instance.base import MonthlySummary, QuarterlySummary, YearlySummary, DailySummary, Money, period_of, quarter_of, from_cents
+from extensions import db
+
+ROLLUP_FIELDS = [column.name for column in MonthlySummary.__table__.columns if isinstance(column.type, Money)]
+
+def shift_month(year, month, offset):
+    index = year * 12 + month - 1 + offset
+    return index // 12, index % 12 + 1
+
+def quarter_window(year, quarter):
+    return (year, quarter * 3 - 2), (year, quarter * 3)
+
+# Splits an inclusive month range into whole years, whole quarters and leftover months,
+# so any window is read from a handful of rollup rows instead of one row per month
+def rollup_pieces(start, end):
+    years, quarters, months = [], [], []
+    year, month = start
+    
+    while (year, month) <= end:
+        if month == 1 and (year, 12) <= end:
+            years.append(year)
+            year += 1
+            continue
+        
+        if month % 3 == 1 and (year, month + 2) <= end:
+            quarters.append((year, quarter_of(month)))
+            year, month = shift_month(year, month, 3)
+        else:
+            months.append((year, month))
+            year, month = shift_month(year, month, 1)
+    
+    return years, quarters, months
+
+def sum_rollup(summary_model, company_id, *conditions):
+    columns = [func.coalesce(func.sum(type_coerce(getattr(summary_model, field), BigInteger)), 0) for field in ROLLUP_FIELDS]
+    row = db.session.query(func.count(summary_model.id), *columns).filter(
+        summary_model.company_id == company_id,
+        *conditions
+    ).one()
+    return row[0], [int(value) for value in row[1:]]
+
+def rollup_parts(company_id, start, end):
+    years, quarters, months = rollup_pieces(start, end)
+    parts = []
+    
+    if years:
+        parts.append(sum_rollup(YearlySummary, company_id, YearlySummary.year.in_(years)))
+    if quarters:
+        parts.append(sum_rollup(
+            QuarterlySummary, company_id,
+            QuarterlySummary.year.between(quarters[0][0], quarters[-1][0]),
+            (QuarterlySummary.year * 10 + QuarterlySummary.quarter).in_([year * 10 + quarter for year, quarter in quarters])
+        ))
+    if months:
+        parts.append(sum_rollup(
+            MonthlySummary, company_id,
+            MonthlySummary.year.between(months[0][0], months[-1][0]),
+            (MonthlySummary.year * 100 + MonthlySummary.month).in_([period_of(year, month) for year, month in months])
+        ))
+    return parts
+
+def combine_parts(parts):
+    # None when no summary row covers the window, matching a missing monthly summary
+    if not any(count for count, _ in parts):
+        return None
+    
+    totals = [sum(values) for values in zip(*[values for _, values in parts])]
+    return SimpleNamespace(**{field: from_cents(total) for field, total in zip(ROLLUP_FIELDS, totals)})
+
+def load_period_totals(company_id, start, end):
+    return combine_parts(rollup_parts(company_id, start, end))
+
+def month_end(year, month):
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+# Whole months inside the range come from the rollups; only the partial months at either edge read day rows,
+# so any range touches at most about sixty daily summaries
+def load_range_totals(company_id, start, end):
+    first = (start.year, start.month) if start.day == 1 else shift_month(start.year, start.month, 1)
+    last = (end.year, end.month) if end == month_end(end.year, end.month) else shift_month(end.year, end.month, -1)
+    
+    if first > last:
+        return combine_parts([sum_rollup(DailySummary, company_id, DailySummary.date.between(start, end))])
+    
+    parts = rollup_parts(company_id, first, last)
+    edges = []
+    if start < datetime.date(*first, 1):
+        edges.append(DailySummary.date.between(start, datetime.date(*first, 1) - datetime.timedelta(days=1)))
+    if end > month_end(*last):
+        edges.append(DailySummary.date.between(month_end(*last) + datetime.timedelta(days=1), end))
+    if edges:
+        parts.append(sum_rollup(DailySummary, company_id, or_(*edges)))
+    
+    return combine_parts(parts)
+
+def load_daily_summaries(company_id, start, end):
+    summaries = DailySummary.query.filter(
+        DailySummary.company_id == company_id,
+        DailySummary.date.between(start, end)
+    ).all()
+    
+    return {summary.date: summary for summary in summaries}
+
+def load_daily_values(company_id, start, end, fields):
+    rows = db.session.query(DailySummary.date, *[getattr(DailySummary, field) for field in fields]).filter(
+        DailySummary.company_id == company_id,
+        DailySummary.date.between(start, end)
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
@@ -0,0 +1,167 @@
+import os
+import hmac
+import time
+import threading
+import psutil
+from flask import g, request, has_request_context
+from flask_login import current_user
+from sqlalchemy import event
+from extensions import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+process = psutil.Process()
+lock = threading.Lock()
+
+request_latency = {}
+request_queries = {}
+request_counts = {}
+sql_totals = {}
+response_bytes = {}
+
+def metrics_access_allowed():
+    # Scrapers authenticate with the METRICS_TOKEN as a bearer token; logged-in Admins can also read the metrics
+    token = os.environ.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode()):
+        return True
+    return current_user.is_authenticated and current_user.type == 'Admin'
+
+def observe(histograms, labels, value, buckets):
+    histogram = histograms.get(labels)
+    if histogram is None:
+        histogram = histograms[labels] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+    
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            histogram['buckets'][index] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def increment(counters, labels, value=1):
+    counters[labels] = counters.get(labels, 0) + value
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - conn.info['query_start_time'].pop())
+
+def handle_query_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; clearing its start time keeps
+    # the next statement on this pooled connection from pairing with it
+    connection = exception_context.connection
+    starts = connection.info.pop('query_start_time', None) if connection is not None else None
+    if starts:
+        record_query(time.perf_counter() - starts[-1])
+
+def record_query(elapsed):
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_queries += 1
+        g.metrics_query_time += elapsed
+        return
+    
+    with lock:
+        increment(sql_totals, ('<background>', 'count'))
+        increment(sql_totals, ('<background>', 'seconds'), elapsed)
+
+def start_request_timer():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_time = 0.0
+
+def store_request(metrics, labels, response):
+    elapsed = time.perf_counter() - metrics.metrics_start
+    endpoint, method = labels
+    
+    with lock:
+        observe(request_latency, labels, elapsed, LATENCY_BUCKETS)
+        observe(request_queries, labels, metrics.metrics_queries, QUERY_COUNT_BUCKETS)
+        increment(request_counts, (endpoint, method, str(response.status_code)))
+        increment(sql_totals, (endpoint, 'count'), metrics.metrics_queries)
+        increment(sql_totals, (endpoint, 'seconds'), metrics.metrics_query_time)
+        # Streamed responses have no length up front and are left out of the size totals
+        if response.content_length is not None:
+            increment(response_bytes, labels, response.content_length)
+
+def record_request(response):
+    if 'metrics_start' not in g:
+        return response
+    
+    metrics = g._get_current_object()
+    labels = (request.endpoint or '<unmatched>', request.method)
+    
+    # Streamed bodies run their queries after this hook, so they are recorded, with the full
+    # streaming time, once the server closes the response
+    if response.is_streamed:
+        response.call_on_close(lambda: store_request(metrics, labels, response))
+    else:
+        store_request(metrics, labels, response)
+    
+    return response
+
+def init_metrics(app):
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(db.engine, 'handle_error', handle_query_error)
+
+def format_labels(names, values):
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def format_histogram(lines, name, help_text, histograms, buckets):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        for bound, count in zip(buckets, histogram['buckets']):
+            lines.append(f"{name}_bucket{format_labels(['endpoint', 'method', 'le'], [endpoint, method, bound])} {count}")
+        lines.append(f"{name}_bucket{format_labels(['endpoint', 'method', 'le'], [endpoint, method, '+Inf'])} {histogram['count']}")
+        lines.append(f"{name}_sum{format_labels(['endpoint', 'method'], [endpoint, method])} {histogram['sum']}")
+        lines.append(f"{name}_count{format_labels(['endpoint', 'method'], [endpoint, method])} {histogram['count']}")
+
+def render_metrics():
+    lines = []
+    
+    with lock:
+        format_histogram(lines, 'http_request_duration_seconds', 'Request latency by endpoint.',
+                         request_latency, LATENCY_BUCKETS)
+        format_histogram(lines, 'http_request_sql_queries', 'SQL statements executed per request.',
+                         request_queries, QUERY_COUNT_BUCKETS)
+        
+        lines.append("# HELP http_requests_total Requests served by endpoint and status.")
+        lines.append("# TYPE http_requests_total counter")
+        for (endpoint, method, status), count in sorted(request_counts.items()):
+            lines.append(f"http_requests_total{format_labels(['endpoint', 'method', 'status'], [endpoint, method, status])} {count}")
+        
+        lines.append("# HELP http_response_size_bytes_total Response body bytes sent by endpoint.")
+        lines.append("# TYPE http_response_size_bytes_total counter")
+        for (endpoint, method), total in sorted(response_bytes.items()):
+            lines.append(f"http_response_size_bytes_total{format_labels(['endpoint', 'method'], [endpoint, method])} {total}")
+        
+        for name, kind, help_text in [
+            ('db_queries_total', 'count', 'SQL statements executed by endpoint.'),
+            ('db_query_duration_seconds_total', 'seconds', 'Time spent in SQL statements by endpoint.')
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (endpoint, total_kind), total in sorted(sql_totals.items()):
+                if total_kind == kind:
+                    lines.append(f"{name}{format_labels(['endpoint'], [endpoint])} {total}")
+    
+    cpu_times = process.cpu_times()
+    lines.append("# HELP process_resident_memory_bytes Resident memory size in bytes.")
+    lines.append("# TYPE process_resident_memory_bytes gauge")
+    lines.append(f"process_resident_memory_bytes {process.memory_info().rss}")
+    lines.append("# HELP process_cpu_seconds_total User and system CPU time in seconds.")
+    lines.append("# TYPE process_cpu_seconds_total counter")
+    lines.append(f"process_cpu_seconds_total {cpu_times.user + cpu_times.system}")
+    lines.append("# HELP process_num_threads Threads in the process.")
+    lines.append("# TYPE process_num_threads gauge")
+    lines.append(f"process_num_threads {process.num_threads()}")
+    
+    return '\n'.join(lines) + '\n'
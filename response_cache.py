@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import request, make_response, Response
+from sqlalchemy import func
+from instance.base import MonthlySummary, QuarterlySummary, YearlySummary, period_of
+from extensions import db
+
+RESPONSE_CACHE_SIZE = 512
+
+class ResponseCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+    
+    def set(self, key, version, body, mimetype):
+        with self.lock:
+            self.entries[key] = (version, body, mimetype)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+def summary_version(summary_model, company_id, *conditions):
+    # Versions only ever grow, so the row count and version sum change with any write to the rows read
+    count, total = db.session.query(
+        func.count(summary_model.id),
+        func.coalesce(func.sum(summary_model.version), 0)
+    ).filter(
+        summary_model.company_id == company_id,
+        *conditions
+    ).one()
+    return f"{count}.{total}"
+
+def summary_window_version(summary_model, company_id, start, end):
+    period = summary_model.year * 100 + summary_model.month
+    return summary_version(summary_model, company_id, period >= period_of(*start), period <= period_of(*end))
+
+def rollup_window_version(company_id, start, end):
+    # Rolled-up totals may read yearly, quarterly or monthly rows for any part of the window
+    years = (start[0], end[0])
+    return '/'.join([
+        summary_version(YearlySummary, company_id, YearlySummary.year.between(*years)),
+        summary_version(QuarterlySummary, company_id, QuarterlySummary.year.between(*years)),
+        summary_window_version(MonthlySummary, company_id, start, end)
+    ])
+
+def versioned_response(version_of):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_of(*args, **kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+            
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            etag = hashlib.sha1(repr((key, version)).encode()).hexdigest()
+            
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                cached = response_cache.get(key, version)
+                if cached:
+                    response = Response(cached[0], mimetype=cached[1])
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    response_cache.set(key, version, response.get_data(), response.mimetype)
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -1,8 +1,11 @@
+import time
 import logging
 import datetime
 import calendar
-from sqlalchemy import extract, and_
-from instance.base import Company, Settings, Employee, Expenses, MonthlySummary
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from instance.base import Company, Settings, Employee, Expenses, period_of, utc_from_local, local_day_from_utc, to_cents, from_cents, LOCAL_TIMEZONE, SOURCE_SALARY, FIXED_EXPENSE_SOURCES
+from ledger_service import summary_delta, delta_key, merge_delta, apply_summary_deltas
 from flask import current_app
 from extensions import db
 
@@ -13,10 +16,31 @@ handler = logging.StreamHandler()
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+def get_salary_day(preferred_day, year, month):
+    if preferred_day == 99:
+        return calendar.monthrange(year, month)[1]
+    else:
+        return min(preferred_day, 28)
+
+def process_company_by_id(company_id, current_date):
+    company = Company.query.get(company_id)
+    
+    if not company or not company.is_active:
+        logger.info(f"Empresa {company_id} inexistente ou inativa; despesas fixas ignoradas.")
+        return
+    
+    settings = Settings.query.filter_by(company_id=company_id).first()
+    
+    if not settings:
+        logger.warning(f"Empresa {company.id} ({company.name}) não possui configurações definidas.")
+        return
+    
+    return process_company_expenses(company, settings, current_date, db)
+
 def check_and_process_salaries(app):
     with app.app_context():
         
-        current_date = datetime.datetime.now()
+        current_date = datetime.datetime.now(LOCAL_TIMEZONE).replace(tzinfo=None)
         current_day = current_date.day
         current_month = current_date.month
         current_year = current_date.year
@@ -24,10 +48,11 @@ def check_and_process_salaries(app):
         logger.info(f"Verificando automação de despesas fixas: data atual {current_date.strftime('%d/%m/%Y')}")
         
         companies = Company.query.filter_by(is_active=True).all()
+        reports = []
         
         if not companies:
             logger.info("Nenhuma empresa ativa encontrada para processar despesas fixas.")
-            return
+            return reports
         
         for company in companies:
             try:
@@ -37,62 +62,100 @@ def check_and_process_salaries(app):
                     logger.warning(f"Empresa {company.id} ({company.name}) não possui configurações definidas.")
                     continue
                 
-                preferred_day = settings.preferred_salary_expense_day
-                
-                if preferred_day == 99:
-                    salary_day = calendar.monthrange(current_year, current_month)[1]
-                else:
-                    salary_day = min(preferred_day, 28)
+                salary_day = get_salary_day(settings.preferred_salary_expense_day, current_year, current_month)
                 
                 if current_day == salary_day:
                     logger.info(f"Hoje é dia de lançamento de despesas fixas para empresa {company.id} ({company.name})")
-                    process_company_expenses(company, settings, current_date, db)
+                    reports.append(process_company_expenses(company, settings, current_date, db))
                 else:
                     logger.debug(f"Hoje não é dia de lançamento de despesas fixas para empresa {company.id} ({company.name}). "
                                 f"Configurado para dia {salary_day}, hoje é dia {current_day}.")
             
             except Exception as e:
                 logger.error(f"Erro ao processar despesas fixas da empresa {company.id}: {str(e)}")
+        
+        return reports
+
+def load_posted_sources(company_id, period):
+    rows = db.session.query(Expenses.source_kind, Expenses.source_ref).filter(
+        Expenses.company_id == company_id,
+        Expenses.source_kind.isnot(None),
+        Expenses.source_period == period
+    )
+    return {(kind, ref) for kind, ref in rows}
+
+def fixed_expense_row(company, source, period, description, gross_value, iva_rate=0, iva_value=0, net_value=None):
+    kind, ref = source
+    return {
+        'transaction_type': "despesa",
+        'description': description,
+        'gross_value': gross_value,
+        'iva_rate': iva_rate,
+        'iva_value': iva_value,
+        'net_value': gross_value if net_value is None else net_value,
+        'user_id': company.user_id,
+        'company_id': company.id,
+        'source_kind': kind,
+        'source_period': period,
+        'source_ref': ref
+    }
+
+def post_company_expenses(company, settings, current_date, db):
+    current_period = period_of(current_date.year, current_date.month)
+    posted = load_posted_sources(company.id, current_period)
+    
+    rows = process_company_salaries(company, posted, current_period, db)
+    rows += process_company_rent(company, settings, posted, current_period)
+    rows += process_employee_insurance(company, settings, posted, current_period)
+    rows += process_company_insurance(company, settings, posted, current_period)
+    rows += process_other_expenses(company, settings, posted, current_period)
+    
+    if rows:
+        # Core inserts skip the mapper events, so create_date, period and local_day are set here; all come from
+        # the run date, like source_period, so a late run still posts into the month it was scheduled for
+        create_date = utc_from_local(current_date)
+        local_day = local_day_from_utc(create_date)
+        deltas = {}
+        for row in rows:
+            row['create_date'] = create_date
+            row['period'] = current_period
+            row['local_day'] = local_day
+            merge_delta(deltas, delta_key(company.id, create_date), summary_delta(row, False))
+        
+        db.session.execute(insert(Expenses), rows)
+        apply_summary_deltas(Expenses, deltas)
+    
+    db.session.commit()
+    return rows
 
 def process_company_expenses(company, settings, current_date, db):
     
     logger.info(f"Processando despesas fixas para empresa {company.id} ({company.name})")
     
-    current_month = current_date.month
-    current_year = current_date.year
-    
-    monthly_summary = MonthlySummary.query.filter_by(
-        month=current_month, 
-        year=current_year,
-        company_id=company.id
-    ).first()
-    
-    if not monthly_summary:
-        monthly_summary = MonthlySummary(
-            month=current_month,
-            year=current_year,
-            company_id=company.id
-        )
-        db.session.add(monthly_summary)
-        db.session.flush()
-    
-    process_company_salaries(company, current_date, monthly_summary, db)
-    
-    process_company_rent(company, settings, current_date, monthly_summary, db)
-    
-    process_employee_insurance(company, settings, current_date, monthly_summary, db)
-    
-    process_company_insurance(company, settings, current_date, monthly_summary, db)
-    
-    process_other_expenses(company, settings, current_date, monthly_summary, db)
+    started = time.perf_counter()
+    report = {'company_id': company.id, 'inserted': 0, 'total': 0.0, 'elapsed_ms': 0.0}
     
     try:
-        db.session.commit()
+        try:
+            rows = post_company_expenses(company, settings, current_date, db)
+        except IntegrityError:
+            # Another run posted some of these sources first; the unique index rejected the whole batch
+            db.session.rollback()
+            logger.warning(f"Despesas fixas da empresa {company.id} lançadas em simultâneo; a repetir com os registos atuais.")
+            rows = post_company_expenses(company, settings, current_date, db)
+        
+        report['inserted'] = len(rows)
+        report['total'] = from_cents(sum(to_cents(row['gross_value']) for row in rows))
     except Exception as e:
         db.session.rollback()
         logger.error(f"Erro ao finalizar processamento de despesas fixas: {str(e)}")
+        report['error'] = str(e)
+    
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(f"Despesas fixas da empresa {company.id}: {report['inserted']} registos, {report['total']}€ em {report['elapsed_ms']} ms")
+    return report
 
-def process_company_salaries(company, current_date, monthly_summary, db):
+def process_company_salaries(company, posted, period, db):
     
     logger.info(f"Processando salários para empresa {company.id} ({company.name})")
     
@@ -100,302 +163,114 @@ def process_company_salaries(company, current_date, monthly_summary, db):
     
     if not active_employees:
         logger.info(f"Empresa {company.id} não tem funcionários ativos.")
-        return
+        return []
     
     logger.info(f"Encontrados {len(active_employees)} funcionários ativos na empresa {company.id}")
     
-    current_month = current_date.month
-    current_year = current_date.year
+    posted_salaries = {ref for kind, ref in posted if kind == SOURCE_SALARY}
     
-    salary_count = Expenses.query.filter(
-        and_(
-            Expenses.company_id == company.id,
-            Expenses.description.like("Salário:%"),
-            extract('month', Expenses.create_date) == current_month,
-            extract('year', Expenses.create_date) == current_year
-        )
-    ).count()
-    
-    if salary_count >= len(active_employees):
+    if posted_salaries.issuperset(employee.id for employee in active_employees):
         logger.info(f"Salários já foram processados para todos os {len(active_employees)} funcionários ativos da empresa {company.id} neste mês.")
-        return
+        return []
     
     newly_added_salaries = 0
-    expenses_created = []  
+    rows = []
     
     for employee in active_employees:
-        try:
-            existing_salary = Expenses.query.filter(
-                and_(
-                    Expenses.company_id == company.id,
-                    Expenses.description.like(f"Salário: {employee.name}%"),
-                    extract('month', Expenses.create_date) == current_month,
-                    extract('year', Expenses.create_date) == current_year
-                )
-            ).first()
-            
-            if existing_salary:
-                logger.info(f"Salário já registrado este mês para {employee.name} (ID: {employee.id})")
-                continue  
-            
-            gross_value = employee.gross_salary
-            
-            if employee.extra_payment > 0:
-                gross_value += employee.extra_payment
-                extra_info = f" + {employee.extra_payment}€ ({employee.extra_payment_description})" if employee.extra_payment_description else f" + {employee.extra_payment}€"
-            else:
-                extra_info = ""
-            
-            newly_added_salaries += gross_value
-            
-            description = f"Salário: {employee.name} - {employee.position}{extra_info}"
-            
-            new_expense = Expenses(
-                transaction_type="despesa",
-                description=description,
-                gross_value=gross_value,
-                iva_rate=0,  
-                iva_value=0,
-                net_value=gross_value,
-                user_id=company.user_id,  
-                company_id=company.id
-            )
-            
-            db.session.add(new_expense)
-            expenses_created.append(new_expense)
-            logger.info(f"Criado registro de salário para {employee.name}: {gross_value}€")
-            
-        except Exception as e:
-            logger.error(f"Erro ao processar salário do funcionário {employee.id}: {str(e)}")
+        if employee.id in posted_salaries:
+            logger.info(f"Salário já registrado este mês para {employee.name} (ID: {employee.id})")
             continue
-    
-    if newly_added_salaries > 0:
-        monthly_summary.total_employee_salaries += newly_added_salaries
-        monthly_summary.total_costs += newly_added_salaries
         
-        monthly_summary.profit = monthly_summary.total_sales - monthly_summary.total_costs
-        monthly_summary.profit_without_vat = monthly_summary.total_sales_without_vat - monthly_summary.total_costs
+        gross_value = employee.gross_salary
+        
+        if employee.extra_payment > 0:
+            gross_value += employee.extra_payment
+            extra_info = f" + {employee.extra_payment}€ ({employee.extra_payment_description})" if employee.extra_payment_description else f" + {employee.extra_payment}€"
+        else:
+            extra_info = ""
+        
+        newly_added_salaries += gross_value
         
-        logger.info(f"Adicionado {newly_added_salaries}€ em novos salários ao resumo mensal.")
+        description = f"Salário: {employee.name} - {employee.position}{extra_info}"
+        
+        rows.append(fixed_expense_row(company, (SOURCE_SALARY, employee.id), period, description, gross_value))
+        logger.info(f"Criado registro de salário para {employee.name}: {gross_value}€")
+    
+    if rows:
+        logger.info(f"Processados {len(rows)} novos salários para a empresa {company.id}")
+        logger.info(f"Total de novos salários adicionados: {newly_added_salaries}€")
     else:
-        logger.info("Nenhum novo salário para adicionar ao resumo mensal.")
+        logger.info("Nenhum novo registro de salário criado.")
     
-    try:
-        db.session.commit()
-        if expenses_created:
-            logger.info(f"Processados {len(expenses_created)} novos salários para a empresa {company.id}")
-            logger.info(f"Total de novos salários adicionados: {newly_added_salaries}€")
-        else:
-            logger.info("Nenhum novo registro de salário criado.")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Erro ao salvar os registros de salários: {str(e)}")
+    return rows
 
-def process_company_rent(company, settings, current_date, monthly_summary, db):
+def process_company_rent(company, settings, posted, period):
     logger.info(f"Processando renda para empresa {company.id} ({company.name})")
     
     if settings.rent_value <= 0:
         logger.info(f"Empresa {company.id} não tem valor de renda configurado.")
-        return
-    
-    current_month = current_date.month
-    current_year = current_date.year
+        return []
     
-    existing_rent = Expenses.query.filter(
-        and_(
-            Expenses.company_id == company.id,
-            Expenses.description == "Renda mensal do espaço",
-            extract('month', Expenses.create_date) == current_month,
-            extract('year', Expenses.create_date) == current_year
-        )
-    ).first()
-    
-    if existing_rent:
+    if ('rent', 0) in posted:
         logger.info(f"Renda já registrada este mês para a empresa {company.id}")
-        return
+        return []
     
     rent_value = settings.rent_value
     iva_rate = 23.0  
     
-    net_value = round(rent_value / 1.23, 2) 
-    iva_value = round(rent_value - net_value, 2)  
-    
-    new_expense = Expenses(
-        transaction_type="despesa",
-        description="Renda mensal do espaço",
-        gross_value=rent_value,
-        iva_rate=iva_rate,
-        iva_value=iva_value,
-        net_value=net_value,
-        user_id=company.user_id,  
-        company_id=company.id
-    )
-    
-    db.session.add(new_expense)
-    
+    # Split in cents, rounding half up, so net and VAT always add back to the gross rent
+    rent_cents = to_cents(rent_value)
+    net_cents = (rent_cents * 200 + 123) // 246
+    net_value = from_cents(net_cents)
+    iva_value = from_cents(rent_cents - net_cents)
     
-    monthly_summary.total_costs += rent_value
-    monthly_summary.total_costs_without_vat += net_value
-    monthly_summary.total_vat -= iva_value  
-    
-    monthly_summary.profit = monthly_summary.total_sales - monthly_summary.total_costs
-    monthly_summary.profit_without_vat = monthly_summary.total_sales_without_vat - monthly_summary.total_costs_without_vat
-    
-    try:
-        db.session.commit()
-        logger.info(f"Registrada renda mensal para empresa {company.id}: {rent_value}€ (IVA: {iva_value}€)")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Erro ao registrar renda mensal: {str(e)}")
+    logger.info(f"Registrada renda mensal para empresa {company.id}: {rent_value}€ (IVA: {iva_value}€)")
+    return [fixed_expense_row(company, ('rent', 0), period, FIXED_EXPENSE_SOURCES['rent'], rent_value, iva_rate, iva_value, net_value)]
 
-def process_employee_insurance(company, settings, current_date, monthly_summary, db):
+def process_employee_insurance(company, settings, posted, period):
     logger.info(f"Processando seguros dos empregados para empresa {company.id} ({company.name})")
     
     if settings.employee_insurance_value <= 0:
         logger.info(f"Empresa {company.id} não tem valor de seguros dos empregados configurado.")
-        return
+        return []
     
-    current_month = current_date.month
-    current_year = current_date.year
-    
-    existing_insurance = Expenses.query.filter(
-        and_(
-            Expenses.company_id == company.id,
-            Expenses.description == "Seguros dos Empregados",
-            extract('month', Expenses.create_date) == current_month,
-            extract('year', Expenses.create_date) == current_year
-        )
-    ).first()
-    
-    if existing_insurance:
+    if ('employee_insurance', 0) in posted:
         logger.info(f"Seguros dos empregados já registrados este mês para a empresa {company.id}")
-        return
+        return []
     
     insurance_value = settings.employee_insurance_value
     
-    new_expense = Expenses(
-        transaction_type="despesa",
-        description="Seguros dos Empregados",
-        gross_value=insurance_value,
-        iva_rate=0,
-        iva_value=0,
-        net_value=insurance_value,
-        user_id=company.user_id,
-        company_id=company.id
-    )
-    
-    db.session.add(new_expense)
-    
-    monthly_summary.total_costs += insurance_value
-    monthly_summary.total_employee_insurance += insurance_value
-    
-    monthly_summary.profit = monthly_summary.total_sales - monthly_summary.total_costs
-    monthly_summary.profit_without_vat = monthly_summary.total_sales_without_vat - monthly_summary.total_costs
-    
-    try:
-        db.session.commit()
-        logger.info(f"Registrados seguros dos empregados para empresa {company.id}: {insurance_value}€")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Erro ao registrar seguros dos empregados: {str(e)}")
+    logger.info(f"Registrados seguros dos empregados para empresa {company.id}: {insurance_value}€")
+    return [fixed_expense_row(company, ('employee_insurance', 0), period, FIXED_EXPENSE_SOURCES['employee_insurance'], insurance_value)]
 
-def process_company_insurance(company, settings, current_date, monthly_summary, db):
+def process_company_insurance(company, settings, posted, period):
     logger.info(f"Processando seguros da empresa {company.id} ({company.name})")
     
     if settings.total_insurance_value <= 0:
         logger.info(f"Empresa {company.id} não tem valor de seguros configurado.")
-        return
+        return []
     
-    current_month = current_date.month
-    current_year = current_date.year
-    
-    
-    existing_insurance = Expenses.query.filter(
-        and_(
-            Expenses.company_id == company.id,
-            Expenses.description == "Seguros da Empresa",  
-            extract('month', Expenses.create_date) == current_month,
-            extract('year', Expenses.create_date) == current_year
-        )
-    ).first()
-    
-    if existing_insurance:
+    if ('company_insurance', 0) in posted:
         logger.info(f"Seguros da empresa já registrados este mês para a empresa {company.id}")
-        return
+        return []
     
     insurance_value = settings.total_insurance_value
     
-    new_expense = Expenses(
-        transaction_type="despesa",
-        description="Seguros da Empresa",
-        gross_value=insurance_value,
-        iva_rate=0,
-        iva_value=0,
-        net_value=insurance_value,
-        user_id=company.user_id,
-        company_id=company.id
-    )
-    
-    db.session.add(new_expense)
-    
-    monthly_summary.total_costs += insurance_value
-    
-    monthly_summary.profit = monthly_summary.total_sales - monthly_summary.total_costs
-    monthly_summary.profit_without_vat = monthly_summary.total_sales_without_vat - monthly_summary.total_costs
-    
-    try:
-        db.session.commit()
-        logger.info(f"Registrados seguros da empresa {company.id}: {insurance_value}€")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Erro ao registrar seguros da empresa: {str(e)}")
+    logger.info(f"Registrados seguros da empresa {company.id}: {insurance_value}€")
+    return [fixed_expense_row(company, ('company_insurance', 0), period, FIXED_EXPENSE_SOURCES['company_insurance'], insurance_value)]
 
-def process_other_expenses(company, settings, current_date, monthly_summary, db):
+def process_other_expenses(company, settings, posted, period):
     logger.info(f"Processando outras despesas para empresa {company.id} ({company.name})")
     
     if settings.other_expenses <= 0:
         logger.info(f"Empresa {company.id} não tem valor de outras despesas configurado.")
-        return
-    
-    current_month = current_date.month
-    current_year = current_date.year
-    
-    existing_expense = Expenses.query.filter(
-        and_(
-            Expenses.company_id == company.id,
-            Expenses.description == "Outras Despesas Fixas",
-            extract('month', Expenses.create_date) == current_month,
-            extract('year', Expenses.create_date) == current_year
-        )
-    ).first()
+        return []
     
-    if existing_expense:
+    if ('other_fixed', 0) in posted:
         logger.info(f"Outras despesas fixas já registradas este mês para a empresa {company.id}")
-        return
+        return []
     
     other_value = settings.other_expenses
     
-    new_expense = Expenses(
-        transaction_type="despesa",
-        description="Outras Despesas Fixas",
-        gross_value=other_value,
-        iva_rate=0,
-        iva_value=0,
-        net_value=other_value,
-        user_id=company.user_id,
-        company_id=company.id
-    )
-    
-    db.session.add(new_expense)
-    
-    monthly_summary.total_costs += other_value
-    
-    monthly_summary.profit = monthly_summary.total_sales - monthly_summary.total_costs
-    monthly_summary.profit_without_vat = monthly_summary.total_sales_without_vat - monthly_summary.total_costs
-    
-    try:
-        db.session.commit()
-        logger.info(f"Registradas outras despesas fixas para empresa {company.id}: {other_value}€")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Erro ao registrar outras despesas fixas: {str(e)}")
\ No newline at end of file
+    logger.info(f"Registradas outras despesas fixas para empresa {company.id}: {other_value}€")
+    return [fixed_expense_row(company, ('other_fixed', 0), period, FIXED_EXPENSE_SOURCES['other_fixed'], other_value)]
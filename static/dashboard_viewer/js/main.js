@@ -252,6 +252,12 @@ function initializeChartSelector() {
   }
 }
 
+function chartPointCount() {
+  // Roughly one point per two pixels; the server downsamples longer series to this size
+  const canvas = document.getElementById("mainChart");
+  return Math.max(Math.round((canvas ? canvas.clientWidth : 800) / 2), 12);
+}
+
 function loadChartData(chartType) {
   const company_id = getCompanyId();
 
@@ -260,7 +266,7 @@ function loadChartData(chartType) {
   fetch(
     `/api/chart-data?company_id=${company_id}&type=${chartType}&month=${
       currentMonth + 1
-    }&year=${currentYear}`
+    }&year=${currentYear}&points=${chartPointCount()}`
   )
     .then((response) => response.json())
     .then((data) => {
@@ -411,7 +417,7 @@ function loadTransactions(transactionType) {
   fetch(
     `/api/transactions?company_id=${company_id}&month=${
       currentMonth + 1
-    }&year=${currentYear}&type=${transactionType}`
+    }&year=${currentYear}&type=${transactionType}&stream=1`
   )
     .then((response) => response.json())
     .then((data) => {
@@ -1075,30 +1081,33 @@ function fetchVatData() {
   const company_id = getCompanyId();
   vatMonthlyData = [];
   
-  const fetchPromises = selectedMonths.map(monthData => {
-    return fetch(`/api/financial-summary?company_id=${company_id}&month=${monthData.month}&year=${monthData.year}`)
-      .then(response => response.json())
-      .then(data => {
-        if (data.success) {
-          return {
-            month: monthData.month,
-            year: monthData.year,
-            label: monthData.label,
-            total_vat: data.summary.total_vat || 0,
-            total_sales: data.summary.total_sales || 0
-          };
-        }
-        return null;
-      })
-      .catch(error => {
-        console.error(`Erro ao buscar dados para ${monthData.label}:`, error);
-        return null;
-      });
-  });
+  const periods = selectedMonths.map(monthData => monthData.year * 100 + monthData.month);
+  const fromPeriod = Math.min(...periods);
+  const toPeriod = Math.max(...periods);
+  const formatPeriod = period => `${Math.floor(period / 100)}-${String(period % 100).padStart(2, "0")}`;
   
-  Promise.all(fetchPromises)
-    .then(results => {
-      vatMonthlyData = results.filter(data => data !== null);
+  fetch(`/api/financial-summary/range?company_id=${company_id}&from=${formatPeriod(fromPeriod)}&to=${formatPeriod(toPeriod)}`)
+    .then(response => response.json())
+    .then(data => {
+      if (!data.success) {
+        throw new Error(data.message);
+      }
+      
+      const summariesByPeriod = {};
+      data.months.forEach(monthData => {
+        summariesByPeriod[monthData.year * 100 + monthData.month] = monthData.summary;
+      });
+      
+      vatMonthlyData = selectedMonths.map(monthData => {
+        const summary = summariesByPeriod[monthData.year * 100 + monthData.month] || {};
+        return {
+          month: monthData.month,
+          year: monthData.year,
+          label: monthData.label,
+          total_vat: summary.total_vat || 0,
+          total_sales: summary.total_sales || 0
+        };
+      });
       
       if (vatMonthlyData.length === 0) {
         alert("Não foram encontrados dados para os meses selecionados.");
@@ -0,0 +1,135 @@
+import os
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from extensions import db
+
+logger = logging.getLogger('storage_profile')
+logger.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_STORAGE_PROFILE = 'production'
+
+# Negative cache_size is in KiB; mmap_size is in bytes; busy_timeout is in milliseconds
+STORAGE_PROFILES = {
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+        'optimize_interval_minutes': 60
+    },
+    'development': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -16 * 1024,
+        'temp_store': 'MEMORY',
+        'optimize_interval_minutes': 60
+    },
+    'test': {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'busy_timeout': 1000,
+        'mmap_size': 0,
+        'cache_size': -8 * 1024,
+        'temp_store': 'MEMORY',
+        'optimize_interval_minutes': None
+    }
+}
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+PRAGMA_ORDER = ['busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store']
+
+def get_storage_profile(name=None):
+    name = name or os.environ.get('STORAGE_PROFILE', DEFAULT_STORAGE_PROFILE)
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Perfil de armazenamento desconhecido: {name} (disponíveis: {', '.join(STORAGE_PROFILES)})")
+    return name, STORAGE_PROFILES[name]
+
+def env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def configure_database(app, default_uri):
+    uri = os.environ.get('DATABASE_URL', default_uri)
+    # Hosted PostgreSQL providers still hand out the deprecated postgres:// scheme
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    
+    url = make_url(uri)
+    options = {'pool_pre_ping': env_flag('DB_POOL_PRE_PING', True)}
+    
+    # In-memory SQLite uses a single-connection pool that takes no sizing arguments
+    if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+        options['pool_size'] = int(os.environ.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+        options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW))
+    
+    statement_timeout = os.environ.get('DB_STATEMENT_TIMEOUT')
+    if statement_timeout and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f"-c statement_timeout={int(statement_timeout)}"}
+    
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return uri
+
+def apply_pragmas(dbapi_connection, profile):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in PRAGMA_ORDER:
+            cursor.execute(f"PRAGMA {pragma}={profile[pragma]}")
+    finally:
+        cursor.close()
+
+def init_storage(app):
+    name, profile = get_storage_profile(app.config.get('STORAGE_PROFILE'))
+    app.config['STORAGE_PROFILE'] = name
+    
+    with app.app_context():
+        engine = db.engine
+        
+        if engine.dialect.name != 'sqlite':
+            return
+        
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, profile)
+    
+    logger.info(f"Perfil de armazenamento '{name}' ativo")
+
+def optimize_storage(app):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        
+        with db.engine.connect() as connection:
+            connection.execute(text("PRAGMA optimize"))
+        logger.info("PRAGMA optimize executado")
+
+def schedule_storage_maintenance(scheduler, app):
+    _, profile = get_storage_profile(app.config.get('STORAGE_PROFILE'))
+    interval = profile['optimize_interval_minutes']
+    
+    if not interval:
+        return None
+    
+    return scheduler.add_job(
+        optimize_storage,
+        trigger='interval',
+        minutes=interval,
+        args=[app],
+        id='storage-optimize',
+        jobstore='memory',
+        replace_existing=True,
+        coalesce=True
+    )
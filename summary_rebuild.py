@@ -0,0 +1,274 @@
+import logging
+import argparse
+import datetime
+from sqlalchemy import func, case, cast, insert, update, literal, type_coerce, BigInteger
+from sqlalchemy.exc import IntegrityError
+from instance.base import (
+    Expenses, SimpleExpenses, MonthlySummary, QuarterlySummary, YearlySummary, DailySummary, SimpleMonthlySummary,
+    period_of, split_period, from_cents
+)
+from ledger_service import UPSERT_DIALECTS, SUMMARY_KEYS, summary_key, merge_delta
+from extensions import db
+
+logger = logging.getLogger('summary_rebuild')
+logger.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+REBUILD_CHUNK_SIZE = 1000
+
+MONTHLY_FIELDS = [
+    'total_sales', 'total_sales_without_vat', 'total_vat', 'total_costs', 'total_costs_without_vat',
+    'profit', 'profit_without_vat', 'total_employee_salaries', 'total_employee_insurance'
+]
+SIMPLE_FIELDS = ['total_sales', 'total_sales_without_vat', 'total_vat', 'total_costs', 'profit', 'profit_without_vat']
+
+def cents(column):
+    return type_coerce(column, BigInteger)
+
+# Totals are summed as integer cents in the database and compared exactly
+def conditional_sum(condition, column):
+    return cast(func.coalesce(func.sum(case((condition, cents(column)), else_=0)), 0), BigInteger)
+
+def expense_sums():
+    is_gain = func.lower(Expenses.transaction_type) == 'ganho'
+    is_cost = func.lower(Expenses.transaction_type) == 'despesa'
+    
+    return [
+        conditional_sum(is_gain, Expenses.gross_value).label('total_sales'),
+        conditional_sum(is_gain, Expenses.net_value).label('total_sales_without_vat'),
+        conditional_sum(is_gain, Expenses.iva_value).label('vat_collected'),
+        conditional_sum(is_cost, Expenses.iva_value).label('vat_paid'),
+        conditional_sum(is_cost, Expenses.gross_value).label('total_costs'),
+        conditional_sum(is_cost, Expenses.net_value).label('total_costs_without_vat'),
+        conditional_sum(is_cost & Expenses.description.like('Salário:%'), Expenses.gross_value).label('total_employee_salaries'),
+        conditional_sum(is_cost & (Expenses.description == 'Seguros dos Empregados'), Expenses.gross_value).label('total_employee_insurance')
+    ]
+
+def expense_totals(row):
+    return {
+        'total_sales': row.total_sales,
+        'total_sales_without_vat': row.total_sales_without_vat,
+        'total_vat': row.vat_collected - row.vat_paid,
+        'total_costs': row.total_costs,
+        'total_costs_without_vat': row.total_costs_without_vat,
+        'profit': row.total_sales - row.total_costs,
+        'profit_without_vat': row.total_sales_without_vat - row.total_costs_without_vat,
+        'total_employee_salaries': row.total_employee_salaries,
+        'total_employee_insurance': row.total_employee_insurance
+    }
+
+def compute_monthly_totals(company_id=None, period=None):
+    query = db.session.query(Expenses.company_id, Expenses.period, *expense_sums()).filter(Expenses.period.isnot(None))
+    
+    if company_id:
+        query = query.filter(Expenses.company_id == company_id)
+    if period:
+        query = query.filter(Expenses.period == period)
+    
+    query = query.group_by(Expenses.company_id, Expenses.period).execution_options(stream_results=True).yield_per(REBUILD_CHUNK_SIZE)
+    
+    return {(row.company_id, *split_period(row.period)): expense_totals(row) for row in query}
+
+def compute_simple_monthly_totals(company_id=None, period=None):
+    is_gain = func.lower(SimpleExpenses.transaction_type) == 'ganho'
+    is_cost = func.lower(SimpleExpenses.transaction_type) == 'despesa'
+    
+    query = db.session.query(
+        SimpleExpenses.company_id,
+        SimpleExpenses.period,
+        conditional_sum(is_gain, SimpleExpenses.gross_value).label('total_sales'),
+        conditional_sum(is_gain, SimpleExpenses.net_value).label('total_sales_without_vat'),
+        conditional_sum(is_gain, SimpleExpenses.iva_value).label('total_vat'),
+        conditional_sum(is_cost, SimpleExpenses.gross_value).label('total_costs')
+    ).filter(SimpleExpenses.period.isnot(None))
+    
+    if company_id:
+        query = query.filter(SimpleExpenses.company_id == company_id)
+    if period:
+        query = query.filter(SimpleExpenses.period == period)
+    
+    query = query.group_by(SimpleExpenses.company_id, SimpleExpenses.period).execution_options(stream_results=True).yield_per(REBUILD_CHUNK_SIZE)
+    
+    totals = {}
+    for row in query:
+        totals[(row.company_id, *split_period(row.period))] = {
+            'total_sales': row.total_sales,
+            'total_sales_without_vat': row.total_sales_without_vat,
+            'total_vat': row.total_vat,
+            'total_costs': row.total_costs,
+            'profit': row.total_sales - row.total_costs,
+            'profit_without_vat': row.total_sales_without_vat - row.total_costs
+        }
+    return totals
+
+def compute_daily_totals(company_id=None):
+    # local_day is stored next to period, so day totals are grouped in SQL like the monthly ones
+    query = db.session.query(Expenses.company_id, Expenses.local_day, *expense_sums()).filter(Expenses.local_day.isnot(None))
+    
+    if company_id:
+        query = query.filter(Expenses.company_id == company_id)
+    
+    query = query.group_by(Expenses.company_id, Expenses.local_day).execution_options(stream_results=True).yield_per(REBUILD_CHUNK_SIZE)
+    
+    return {(row.company_id, row.local_day): expense_totals(row) for row in query}
+
+def rollup_totals(monthly_totals, summary_model):
+    totals = {}
+    for (company_id, year, month), values in monthly_totals.items():
+        key = summary_key(summary_model, datetime.date(year, month, 1))
+        merge_delta(totals, (company_id, *key.values()), values)
+    return totals
+
+def find_drift(summary_model, fields, totals, company_id=None):
+    key_columns = SUMMARY_KEYS[summary_model]
+    query = db.session.query(summary_model.id, summary_model.company_id, *[getattr(summary_model, column) for column in key_columns],
+                             *[cents(getattr(summary_model, field)).label(field) for field in fields])
+    if company_id:
+        query = query.filter(summary_model.company_id == company_id)
+    
+    query = query.execution_options(stream_results=True).yield_per(REBUILD_CHUNK_SIZE)
+    stored = {(row.company_id, *[getattr(row, column) for column in key_columns]): row for row in query}
+    zero = dict.fromkeys(fields, 0)
+    
+    drift = []
+    for key in sorted(set(totals) | set(stored)):
+        expected = totals.get(key, zero)
+        row = stored.get(key)
+        
+        differences = {}
+        for field in fields:
+            current = (getattr(row, field) or 0) if row else 0
+            if current != expected[field]:
+                differences[field] = {'stored': from_cents(current), 'expected': from_cents(expected[field])}
+        
+        if row is None and key in totals:
+            status = 'missing'
+        elif differences:
+            status = 'drift'
+        else:
+            continue
+        
+        drift.append({
+            'id': row.id if row else None,
+            'company_id': key[0],
+            **dict(zip(key_columns, key[1:])),
+            'status': status,
+            'differences': differences,
+            'expected': {field: from_cents(value) for field, value in expected.items()}
+        })
+    return drift
+
+def repair_drift(summary_model, drift):
+    updates = [dict(entry['expected'], id=entry['id']) for entry in drift if entry['id'] is not None]
+    inserts = [
+        dict(entry['expected'], company_id=entry['company_id'], **{column: entry[column] for column in SUMMARY_KEYS[summary_model]})
+        for entry in drift if entry['id'] is None
+    ]
+    
+    if updates:
+        db.session.execute(update(summary_model), updates)
+        db.session.execute(update(summary_model).where(
+            summary_model.id.in_([entry['id'] for entry in updates])
+        ).values(version=func.coalesce(summary_model.version, 0) + 1))
+    if inserts:
+        db.session.execute(insert(summary_model), [dict(entry, version=1) for entry in inserts])
+
+SUMMARY_SOURCES = {
+    MonthlySummary: (MONTHLY_FIELDS, compute_monthly_totals),
+    SimpleMonthlySummary: (SIMPLE_FIELDS, compute_simple_monthly_totals)
+}
+
+def materialize_summary(summary_model, company_id, year, month):
+    summary = summary_model.query.filter_by(company_id=company_id, month=month, year=year).first()
+    if summary:
+        return summary
+    
+    # Months without ledger rows are answered as zeros by the caller instead of storing an empty row on every browse
+    fields, compute = SUMMARY_SOURCES[summary_model]
+    totals = compute(company_id, period_of(year, month)).get((company_id, year, month))
+    if totals is None:
+        return None
+    
+    row = {field: literal(totals[field], BigInteger) for field in fields}
+    row.update(month=month, year=year, company_id=company_id, version=1)
+    
+    # A concurrent request may have materialized the month first; its row is kept and this insert is dropped
+    table = summary_model.__table__
+    upsert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if upsert:
+        db.session.execute(upsert(table).values(**row).on_conflict_do_nothing(index_elements=['month', 'year', 'company_id']))
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**row))
+        except IntegrityError:
+            pass
+    db.session.commit()
+    
+    return summary_model.query.filter_by(company_id=company_id, month=month, year=year).first()
+
+SUMMARY_NAMES = ['monthly', 'quarterly', 'yearly', 'daily', 'simple_monthly']
+
+def reconcile_summaries(repair=False, company_id=None, only=None):
+    names = only or SUMMARY_NAMES
+    report = {}
+    
+    # Quarterly and yearly totals are rolled up from the monthly ones instead of scanning the ledger again
+    monthly_totals = compute_monthly_totals(company_id) if {'monthly', 'quarterly', 'yearly'} & set(names) else {}
+    
+    for name, summary_model, fields, compute in [
+        ('monthly', MonthlySummary, MONTHLY_FIELDS, lambda: monthly_totals),
+        ('quarterly', QuarterlySummary, MONTHLY_FIELDS, lambda: rollup_totals(monthly_totals, QuarterlySummary)),
+        ('yearly', YearlySummary, MONTHLY_FIELDS, lambda: rollup_totals(monthly_totals, YearlySummary)),
+        ('daily', DailySummary, MONTHLY_FIELDS, lambda: compute_daily_totals(company_id)),
+        ('simple_monthly', SimpleMonthlySummary, SIMPLE_FIELDS, lambda: compute_simple_monthly_totals(company_id)),
+    ]:
+        if name not in names:
+            continue
+        
+        drift = find_drift(summary_model, fields, compute(), company_id)
+        report[name] = drift
+        logger.info(f"{len(drift)} resumos {name} com divergências")
+        
+        if repair and drift:
+            repair_drift(summary_model, drift)
+    
+    if repair:
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao corrigir resumos mensais: {str(e)}")
+            raise
+    
+    return report
+
+def period_label(entry):
+    if 'date' in entry:
+        return entry['date'].isoformat()
+    if 'month' in entry:
+        return f"{entry['month']:02d}/{entry['year']}"
+    if 'quarter' in entry:
+        return f"T{entry['quarter']}/{entry['year']}"
+    return str(entry['year'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcular resumos mensais a partir das transações e comparar com os valores guardados.")
+    parser.add_argument('--repair', action='store_true', help="Corrigir as divergências encontradas")
+    parser.add_argument('--company-id', type=int)
+    parser.add_argument('--only', nargs='*', choices=SUMMARY_NAMES,
+                        help="Verificar apenas os resumos indicados")
+    args = parser.parse_args()
+    
+    from app import app
+    
+    with app.app_context():
+        report = reconcile_summaries(repair=args.repair, company_id=args.company_id, only=args.only)
+    
+    for name, drift in report.items():
+        for entry in drift:
+            fields = ', '.join(f"{field}: {values['stored']} -> {values['expected']}" for field, values in entry['differences'].items())
+            print(f"[{name}] empresa {entry['company_id']} {period_label(entry)} ({entry['status']}): {fields}")
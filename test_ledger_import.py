@@ -0,0 +1,20 @@
+import pandas as pd
+from ledger_import import parse_amounts
+
+def parsed(*values):
+    return parse_amounts(pd.Series(values, dtype=object)).tolist()
+
+def test_thousands_separators_in_both_locales():
+    assert parsed('1,234.56', '1.234,56') == [1234.56, 1234.56]
+    assert parsed('1,234,567.89', '1.234.567,89') == [1234567.89, 1234567.89]
+    assert parsed('€ 12 345,60', '-2,500.5') == [12345.6, -2500.5]
+
+def test_single_separator_is_decimal():
+    assert parsed('12,5', '12.5', '1500') == [12.5, 12.5, 1500.0]
+
+def test_repeated_separator_only_groups_thousands():
+    assert parsed('1.234.567', '1,234,567') == [1234567.0, 1234567.0]
+
+def test_invalid_amounts_are_missing():
+    assert pd.isna(parsed('abc')[0])
+    assert parse_amounts(pd.Series([10, 2.5])).tolist() == [10.0, 2.5]
@@ -0,0 +1,48 @@
+import time
+import threading
+from flask_login import UserMixin
+from instance.base import User
+from extensions import db
+
+USER_CACHE_TTL = 300
+USER_CACHE_SIZE = 1024
+
+lock = threading.Lock()
+cached_users = {}
+
+# Detached copy of the fields requests read from current_user; it never touches the session
+class CachedUser(UserMixin):
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.name = user.name
+        self.type = user.type
+        self.active = user.active
+        self.is_locked = user.is_locked
+
+def load_cached_user(user_id):
+    now = time.monotonic()
+    
+    with lock:
+        entry = cached_users.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+    
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate_user(user_id)
+        return None
+    
+    cached = CachedUser(user)
+    with lock:
+        cached_users[user_id] = (now + USER_CACHE_TTL, cached)
+        if len(cached_users) > USER_CACHE_SIZE:
+            for key in [key for key, (expires, _) in cached_users.items() if expires <= now]:
+                del cached_users[key]
+            while len(cached_users) > USER_CACHE_SIZE:
+                del cached_users[next(iter(cached_users))]
+    return cached
+
+def invalidate_user(user_id):
+    with lock:
+        cached_users.pop(user_id, None)